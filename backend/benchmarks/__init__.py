@@ -0,0 +1,12 @@
+"""
+Benchmarks for the webhook -> execution path.
+
+    cd backend
+    python -m benchmarks                      # default scenario matrix
+    python -m benchmarks --scenario fan_out:100 --requests 500 --concurrency 50
+    python -m benchmarks.compare results/old.json results/new.json
+
+Email and Telegram go through the real node handlers but are sent to the
+in-process fake transports (executor/transports.py), so no network access
+or real credentials are needed.
+"""
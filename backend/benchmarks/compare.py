@@ -0,0 +1,64 @@
+"""
+Compare two benchmark result files scenario by scenario.
+
+    python -m benchmarks.compare results/base.json results/head.json --threshold 10
+
+Exits with status 1 when any shared scenario's p95 latency got worse by
+more than --threshold percent, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(base: dict, head: dict, threshold: float) -> bool:
+    print(f"base {base['commit']} ({base['created_at']})  ->  head {head['commit']} ({head['created_at']})")
+    if base["parameters"] != head["parameters"]:
+        print("⚠️ Runs used different parameters; numbers may not be comparable")
+
+    head_results = {r["scenario"]: r for r in head["results"]}
+    regressed = False
+    print(f"\n{'scenario':>14}  {'req/s':>16}  {'p50 ms':>16}  {'p95 ms':>16}  {'p99 ms':>16}")
+    for old in base["results"]:
+        new = head_results.get(old["scenario"])
+        if new is None:
+            continue
+
+        cells = []
+        for old_value, new_value in (
+            (old["throughput_rps"], new["throughput_rps"]),
+            (old["latency_ms"]["p50"], new["latency_ms"]["p50"]),
+            (old["latency_ms"]["p95"], new["latency_ms"]["p95"]),
+            (old["latency_ms"]["p99"], new["latency_ms"]["p99"]),
+        ):
+            cells.append(f"{new_value:>8.1f} {_change(old_value, new_value):>+6.1f}%")
+
+        p95_change = _change(old["latency_ms"]["p95"], new["latency_ms"]["p95"])
+        flag = ""
+        if p95_change > threshold:
+            regressed = True
+            flag = "  ❌ regression"
+        print(f"{old['scenario']:>14}  " + "  ".join(cells) + flag)
+
+    return regressed
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("base", type=Path)
+    parser.add_argument("head", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed p95 slowdown in percent")
+    args = parser.parse_args(argv)
+
+    base = json.loads(args.base.read_text())
+    head = json.loads(args.head.read_text())
+    sys.exit(1 if compare(base, head, args.threshold) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+DEFAULT_SCENARIOS = [
+    "fan_out:10", "fan_out:100", "fan_out:1000",
+    "chain:10", "chain:100",
+    "random:10", "random:100", "random:1000",
+]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Drive /webh/webhook/{path} with synthetic workflows and report latency",
+    )
+    parser.add_argument("--scenario", action="append", metavar="SHAPE:NODES",
+                        help=f"fan_out, chain or random with a node count; repeatable (default: {' '.join(DEFAULT_SCENARIOS)})")
+    parser.add_argument("--requests", type=int, default=200, help="measured webhook calls per scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="webhook calls in flight at once")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured calls before each scenario")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated SMTP/Telegram round trip")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="random extra latency, 0..jitter")
+    parser.add_argument("--alloc-requests", type=int, default=20,
+                        help="calls made under tracemalloc after the timed run (0 to skip)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="defaults to a throwaway SQLite file")
+    parser.add_argument("--output", type=Path, help="JSON result file (default: benchmarks/results/<commit>-<time>.json)")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args) -> None:
+    """Must run before the app is imported: settings are read at import time."""
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    os.environ.setdefault("ALLOWED_ORIGINS", "*")
+    os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+    # Inline webhook runs only; don't let idle queue workers poll the database
+    os.environ.setdefault("EXECUTION_WORKERS", "0")
+    # Email and Telegram go to the in-process fakes (unpaced, see executor/transports.py)
+    os.environ["TRANSPORT_MODE"] = "fake"
+    # Per-send INFO records would be part of what is measured
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    if str(BACKEND_DIR) not in sys.path:
+        sys.path.insert(0, str(BACKEND_DIR))
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def _drive(client, url: str, total: int, concurrency: int) -> tuple:
+    """Fire `total` POSTs with at most `concurrency` in flight. Returns (latencies_s, errors)."""
+    latencies, errors = [], 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await client.post(url, json={"source": "benchmark"})
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, total))))
+    return latencies, errors
+
+
+async def _setup(client) -> tuple:
+    """Create a user and one credential per platform. Returns (auth headers, credential ids)."""
+    account = {"email": "bench@example.com", "password": "benchmark"}
+    await client.post("/auth/signup", json=account)
+    response = await client.post("/auth/signin", json=account)
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    credentials = {}
+    for platform_name, data in (
+        ("email", {"from_email": "bench@example.com", "app_password": "benchmark"}),
+        ("telegram", {"access_token": "benchmark"}),
+    ):
+        response = await client.post(
+            "/credential/credential",
+            json={"title": f"bench-{platform_name}", "platform": platform_name, "data": data},
+            headers=headers,
+        )
+        response.raise_for_status()
+        credentials[platform_name] = str(response.json()["id"])
+    return headers, credentials
+
+
+async def run_scenario(client, headers: dict, credentials: dict, scenario: str, args) -> dict:
+    from benchmarks.workflows import build_workflow
+
+    shape, _, size = scenario.partition(":")
+    workflow = build_workflow(shape, int(size), credentials, seed=args.seed)
+    response = await client.post("/workf/workflow", json=workflow, headers=headers)
+    response.raise_for_status()
+    url = f"/webh/webhook/{response.json()['webhook_path']}"
+
+    if args.warmup:
+        await _drive(client, url, args.warmup, args.concurrency)
+
+    started = time.perf_counter()
+    latencies, errors = await _drive(client, url, args.requests, args.concurrency)
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "scenario": scenario,
+        "shape": shape,
+        "nodes": int(size),
+        "requests": args.requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(args.requests / elapsed, 2) if elapsed else 0.0,
+    }
+
+    ordered = sorted(latencies)
+    result["latency_ms"] = {
+        "mean": round(statistics.fmean(ordered) * 1000, 3),
+        "p50": round(percentile(ordered, 50) * 1000, 3),
+        "p95": round(percentile(ordered, 95) * 1000, 3),
+        "p99": round(percentile(ordered, 99) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3),
+    }
+
+    # Separate pass: tracemalloc slows allocation-heavy code and would skew the latencies above
+    if args.alloc_requests:
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        await _drive(client, url, args.alloc_requests, args.concurrency)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["allocations"] = {
+            "requests": args.alloc_requests,
+            "peak_kib": round((peak - baseline) / 1024, 1),
+            "retained_kib": round((current - baseline) / 1024, 1),
+            "peak_kib_per_request": round((peak - baseline) / 1024 / args.alloc_requests, 2),
+        }
+
+    return result
+
+
+async def run(args) -> dict:
+    import httpx
+    from executor import transports
+    import main
+
+    fakes = transports.default = transports.fake_transports(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=0.0, seed=args.seed
+    )
+    scenarios = args.scenario or DEFAULT_SCENARIOS
+    results = []
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            headers, credentials = await _setup(client)
+            for scenario in scenarios:
+                result = await run_scenario(client, headers, credentials, scenario, args)
+                results.append(result)
+                _print_result(result)
+
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "latency_ms": args.latency_ms,
+            "jitter_ms": args.jitter_ms,
+            "alloc_requests": args.alloc_requests,
+            "seed": args.seed,
+        },
+        "sends": {"email": fakes.smtp.sent, "telegram": fakes.telegram.sent},
+        "results": results,
+    }
+
+
+def _print_result(result: dict) -> None:
+    latency = result["latency_ms"]
+    line = (
+        f"{result['scenario']:>14}  {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {latency['p50']:>9.2f}ms  p95 {latency['p95']:>9.2f}ms  p99 {latency['p99']:>9.2f}ms"
+    )
+    if "allocations" in result:
+        line += f"  peak {result['allocations']['peak_kib']:>9.1f} KiB"
+    if result["errors"]:
+        line += f"  errors {result['errors']}"
+    print(line, flush=True)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    for scenario in args.scenario or []:
+        shape, sep, size = scenario.partition(":")
+        if not sep or not size.isdigit():
+            raise SystemExit(f"Invalid --scenario '{scenario}', expected SHAPE:NODES (e.g. fan_out:100)")
+
+    configure_environment(args)
+    report = asyncio.run(run(args))
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = RESULTS_DIR / f"{report['commit']}-{stamp}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n📄 Results saved to {output}")
@@ -0,0 +1,56 @@
+import random
+from typing import Dict, List
+
+SHAPES = ("fan_out", "chain", "random")
+
+
+def _action_node(index: int, credentials: Dict[str, str]) -> dict:
+    """Alternate email and Telegram nodes so both handlers are exercised."""
+    if index % 2:
+        return {
+            "id": f"n{index}",
+            "platform": "email",
+            "name": f"Email {index}",
+            "credential_id": credentials["email"],
+            "data": {"to_email": f"user{index}@example.com", "subject": f"Run {index}", "body": "Hello"},
+        }
+    return {
+        "id": f"n{index}",
+        "platform": "telegram",
+        "name": f"Telegram {index}",
+        "credential_id": credentials["telegram"],
+        "data": {"chat_id": 1000 + index, "message": f"Hello from node {index}"},
+    }
+
+
+def _trigger() -> dict:
+    return {"id": "n0", "platform": "trigger", "name": "Webhook", "data": {"condition": "benchmark"}}
+
+
+def build_workflow(shape: str, size: int, credentials: Dict[str, str], seed: int = 0) -> dict:
+    """
+    Build a WorkflowCreate payload with `size` nodes (trigger included).
+
+    - fan_out: the trigger feeds every other node, one wide level
+    - chain:   every node feeds the next, `size` levels deep
+    - random:  a random DAG, each node has 1-3 parents among earlier nodes
+    """
+    if shape not in SHAPES:
+        raise ValueError(f"Unknown shape '{shape}', expected one of {SHAPES}")
+    if size < 2:
+        raise ValueError("A workflow needs at least 2 nodes")
+
+    nodes = [_trigger()] + [_action_node(i, credentials) for i in range(1, size)]
+    connections: List[dict] = []
+
+    if shape == "fan_out":
+        connections = [{"source": "n0", "target": f"n{i}"} for i in range(1, size)]
+    elif shape == "chain":
+        connections = [{"source": f"n{i - 1}", "target": f"n{i}"} for i in range(1, size)]
+    else:
+        rng = random.Random(seed)
+        for i in range(1, size):
+            parents = rng.sample(range(i), min(i, rng.randint(1, 3)))
+            connections.extend({"source": f"n{p}", "target": f"n{i}"} for p in sorted(parents))
+
+    return {"title": f"bench-{shape}-{size}", "nodes": nodes, "connections": connections}
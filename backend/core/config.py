@@ -12,14 +12,114 @@ class Settings(BaseSettings):
 
     OPENAI_API_KEY: str
 
+    # Logging (records are queued and written by a background thread)
+    LOG_LEVEL: str = "INFO"                     # DEBUG, INFO, WARNING, ERROR, or OFF
+    LOG_FORMAT: str = "json"                    # "json" or "text"
+    LOG_QUEUE_SIZE: int = 10000                 # records beyond this are dropped, never waited on
+    LOG_SAMPLE_RATE: float = 1.0                # fraction of DEBUG/INFO records kept; warnings always are
+
+    # Executor
+    EXECUTOR_MAX_CONCURRENCY: int = 64          # node handlers running at once across the process
+    EXECUTOR_MAX_CONCURRENCY_PER_RUN: int = 8   # node handlers running at once inside one execution
+    EXECUTOR_FAILURE_MODE: str = "cancel"       # "cancel" sibling branches on error, or let them "finish"
+    PLAN_CACHE_SIZE: int = 512                  # compiled workflow plans kept in memory
+    NODE_TIMEOUT_SECONDS: float = 120.0         # per node attempt, rate-limit waits excluded, unless the node sets timeout_seconds; 0 = none
+
+    # Durable execution queue ("immediately" response mode)
+    EXECUTION_WORKERS: int = 4                  # jobs the API process runs itself; 0 leaves them to worker.py
+    EXECUTION_QUEUE_SIZE: int = 1000            # max pending executions before webhooks get 503
+    EXECUTION_POLL_INTERVAL: float = 1.0        # seconds between queue polls when idle
+    EXECUTION_LEASE_SECONDS: int = 300          # a job is re-claimed if its worker stops renewing for this long
+    EXECUTION_MAX_ATTEMPTS: int = 3
+    EXECUTION_SHUTDOWN_GRACE: float = 10.0      # seconds running jobs get to finish on shutdown
+
+    # Webhook request bodies
+    WEBHOOK_MAX_BODY_BYTES: int = 10 * 1024 * 1024   # larger bodies get 413
+    WEBHOOK_SPOOL_BYTES: int = 1024 * 1024           # bodies above this are buffered in a temp file
+
+    # Webhook idempotency (opt-in per workflow on the trigger node)
+    IDEMPOTENCY_TTL: int = 3600                 # seconds a key is remembered, unless the trigger sets its own
+    IDEMPOTENCY_CACHE_SIZE: int = 10000         # keys kept in memory per process
+    IDEMPOTENCY_SHARED: bool = False            # also record keys in the DB so all API processes dedup together
+    IDEMPOTENCY_LOCK_SECONDS: int = 300         # a shared key stuck "running" (crashed process) frees up after this
+    IDEMPOTENCY_WAIT_SECONDS: float = 30.0      # a duplicate waits this long for the first call, then gets 409
+
+    # Burst coalescing (opt-in per workflow with batch_window_ms / batch_max_events on the trigger)
+    BATCH_DEFAULT_WINDOW_MS: int = 1000         # window when the trigger only sets batch_max_events
+    BATCH_DEFAULT_MAX_EVENTS: int = 500         # batch size cap when the trigger only sets batch_window_ms
+    BATCH_MAX_PENDING_EVENTS: int = 10000       # events buffered across all workflows before webhooks get 503
+
+    # Cross-process cache invalidation (serve.py / worker.py run several processes)
+    CACHE_EVENT_POLL_INTERVAL: float = 1.0      # seconds between cache_events polls; 0 = single process, off
+    CACHE_EVENT_RETENTION: int = 3600           # seconds events are kept; a process offline longer clears its caches
+    DB_CREATE_TABLES: bool = True               # create missing tables on import; serve.py does it once instead
+
+    # Write-behind execution history for inline webhook runs
+    HISTORY_FLUSH_RECORDS: int = 100            # flush once this many executions are buffered...
+    HISTORY_FLUSH_INTERVAL_MS: int = 500        # ...or this often, whichever comes first
+    HISTORY_MAX_PENDING: int = 10000            # oldest records are dropped beyond this
+
+    # Email node SMTP pool
+    SMTP_POOL_MAX_PER_KEY: int = 4              # sessions per (host, port, from_email)
+    SMTP_POOL_IDLE_TIMEOUT: float = 60.0        # idle sessions are closed after this many seconds
+    SMTP_POOL_CHECK_INTERVAL: float = 15.0      # NOOP sessions idle longer than this before reuse
+    SMTP_POOL_THREADS: int = 16
+    SMTP_TIMEOUT: float = 30.0
+    EMAIL_BATCH_MAX_RECIPIENTS: int = 5000      # per email node execution in batch mode
+    EMAIL_RATE_PER_SECOND: float = 5.0          # sends per second per email credential
+    EMAIL_RATE_BURST: int = 10
+    EMAIL_THROTTLE_PAUSE: float = 30.0          # seconds to hold sends after a 421/450/451 reply
+
+    # Telegram node Bot pool
+    TELEGRAM_POOL_MAX_BOTS: int = 128           # distinct access tokens kept alive
+    TELEGRAM_CONNECTIONS_PER_BOT: int = 8
+    TELEGRAM_TIMEOUT: float = 10.0
+    TELEGRAM_RATE_PER_BOT: int = 30             # messages per second per bot
+    TELEGRAM_RATE_PER_CHAT: float = 1.0         # messages per second per chat
+    TELEGRAM_MAX_RETRIES: int = 3               # resends after a 429 retry_after
+    TELEGRAM_MAX_RETRY_AFTER: float = 60.0      # give up if Telegram asks us to wait longer
+
+    # Outbound transports. Test runs always use the in-process fakes;
+    # TRANSPORT_MODE="fake" routes normal runs to them too (load tests, replays)
+    TRANSPORT_MODE: str = "live"                # "live" or "fake"
+    FAKE_TRANSPORT_LATENCY_MS: float = 0.0      # simulated round trip per send
+    FAKE_TRANSPORT_JITTER_MS: float = 0.0       # plus a random 0..jitter
+    FAKE_TRANSPORT_ERROR_RATE: float = 0.0      # fraction of sends that fail
+    FAKE_TRANSPORT_RECORD_LIMIT: int = 1000     # recorded messages kept per fake
+
+    # Authentication
+    AUTH_TOKEN_CACHE_SIZE: int = 10000          # verified JWTs kept until they expire
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL: float = 60.0           # seconds a user-exists check is trusted
+
+    # Password hashing (bcrypt) pool
+    PASSWORD_HASH_WORKERS: int = 2              # bcrypt calls running at once
+    PASSWORD_HASH_QUEUE_SIZE: int = 32          # waiting calls beyond this get 429
+
+    # Validated node credentials
+    CREDENTIAL_CACHE_SIZE: int = 1024
+    CREDENTIAL_CACHE_TTL: float = 300.0         # seconds
+
 
     @field_validator("ALLOWED_ORIGINS")
     def parsed_allowed_origins(cls, v:str) -> List[str]:
         return v.split(",") if v else []
 
+    @field_validator("EXECUTOR_FAILURE_MODE")
+    def validate_failure_mode(cls, v: str) -> str:
+        if v not in ("cancel", "finish"):
+            raise ValueError("EXECUTOR_FAILURE_MODE must be 'cancel' or 'finish'")
+        return v
+
+    @field_validator("TRANSPORT_MODE")
+    def validate_transport_mode(cls, v: str) -> str:
+        if v not in ("live", "fake"):
+            raise ValueError("TRANSPORT_MODE must be 'live' or 'fake'")
+        return v
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
         case_sensitive = True
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
@@ -0,0 +1,150 @@
+"""
+Structured, non-blocking logging.
+
+Request handlers only put records on a bounded queue; a background
+thread (QueueListener) formats them and writes to stdout. When the queue
+is full, records are dropped and counted rather than blocking the event
+loop. Workflow and execution ids are attached from context variables set
+with `log_context()`, so every record inside a run carries them.
+
+    logger = logging.getLogger(__name__)
+    logger.debug("Executing node %s", node.id)   # free when DEBUG is off
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from core.config import settings
+from core.metrics import LOG_DROPPED
+
+workflow_id_var: ContextVar[Optional[int]] = ContextVar("workflow_id", default=None)
+execution_id_var: ContextVar[Optional[int]] = ContextVar("execution_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["_QueueHandler"] = None
+
+
+@contextmanager
+def log_context(workflow_id=None, execution_id=None):
+    """Tag every record logged inside the block (and tasks it starts) with these ids."""
+    tokens = []
+    if workflow_id is not None:
+        tokens.append((workflow_id_var, workflow_id_var.set(workflow_id)))
+    if execution_id is not None:
+        tokens.append((execution_id_var, execution_id_var.set(execution_id)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class _ContextFilter(logging.Filter):
+    """Adds workflow/execution ids and samples DEBUG/INFO records at LOG_SAMPLE_RATE."""
+
+    def __init__(self, sample_rate: float):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.sample_rate < 1.0 and record.levelno < logging.WARNING and random.random() >= self.sample_rate:
+            return False
+        record.workflow_id = workflow_id_var.get()
+        record.execution_id = execution_id_var.get()
+        return True
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only resolve what can't cross threads safely; formatting happens on the writer thread
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_DROPPED.inc()
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s%(ids)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        ids = []
+        if getattr(record, "workflow_id", None) is not None:
+            ids.append(f"workflow={record.workflow_id}")
+        if getattr(record, "execution_id", None) is not None:
+            ids.append(f"execution={record.execution_id}")
+        record.ids = f" [{' '.join(ids)}]" if ids else ""
+        return super().format(record)
+
+
+def setup_logging() -> None:
+    """Route the root logger through the queue. Safe to call more than once."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    root = logging.getLogger()
+    level = settings.LOG_LEVEL.upper()
+    if level == "OFF":
+        # Nothing is enabled, so logger calls return before building a record
+        logging.disable(logging.CRITICAL)
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JSONFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+
+    _queue_handler = _QueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(_ContextFilter(settings.LOG_SAMPLE_RATE))
+
+    root.handlers = [_queue_handler]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Write out whatever is still queued and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
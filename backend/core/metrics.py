@@ -0,0 +1,241 @@
+"""
+In-process metrics, exported in the Prometheus text format at /metrics.
+
+Deliberately tiny: a dict of label values -> number behind a lock, so
+recording a sample costs a dict lookup and an addition. Histograms keep
+cumulative bucket counts, which is what Prometheus expects.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Seconds; covers a cached DB lookup up to a slow SMTP login
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def replace(self, values: Dict[Tuple[str, ...], float]) -> None:
+        """Swap in a full snapshot (label tuple -> value), dropping label sets no longer present."""
+        with self._lock:
+            self._values = {tuple(str(v) for v in k): value for k, value in values.items()}
+
+    @contextmanager
+    def track(self, **labels):
+        """Count the enclosed block as in flight."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> [per-bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of the enclosed block. If the histogram has a
+        "status" label and none is given, it is filled in with "success" or
+        "error" depending on whether the block raised.
+        """
+        fill_status = "status" in self.labelnames and "status" not in labels
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            if fill_status:
+                labels["status"] = "error"
+            raise
+        finally:
+            if fill_status:
+                labels.setdefault("status", "success")
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+
+        lines = []
+        names = self.labelnames + ("le",)
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+
+# -------- Metrics -------- #
+
+WORKFLOW_DURATION = registry.register(Histogram(
+    "workflow_execution_seconds", "Duration of execute_workflow runs", ["workflow_id", "status"]
+))
+WORKFLOWS_IN_FLIGHT = registry.register(Gauge(
+    "workflow_executions_in_flight", "Workflow runs currently executing", ["workflow_id"]
+))
+NODE_DURATION = registry.register(Histogram(
+    "node_execution_seconds", "Duration of node handlers", ["workflow_id", "platform", "status"]
+))
+NODES_IN_FLIGHT = registry.register(Gauge(
+    "node_executions_in_flight", "Node handlers currently running", ["platform"]
+))
+DB_DURATION = registry.register(Histogram(
+    "db_query_seconds", "Duration of database round trips on the execution path", ["operation", "status"]
+))
+SEND_DURATION = registry.register(Histogram(
+    "outbound_send_seconds", "Duration of outbound sends, including pool checkout", ["platform", "status"]
+))
+SMTP_LOGIN_DURATION = registry.register(Histogram(
+    "smtp_login_seconds", "New SMTP sessions: connect, STARTTLS and AUTH", ["status"]
+))
+EXECUTION_QUEUE_PENDING = registry.register(Gauge(
+    "execution_queue_pending", "Executions waiting in the durable queue"
+))
+EXECUTION_QUEUE_RUNNING = registry.register(Gauge(
+    "execution_queue_running", "Queued executions running in this process"
+))
+RATE_LIMIT_WAITING = registry.register(Gauge(
+    "rate_limit_waiting", "Sends waiting for a rate-limit token", ["platform"]
+))
+CREDENTIAL_CACHE = registry.register(Gauge(
+    "credential_cache", "Credential cache hits, misses and size", ["stat"]
+))
+HISTORY_PENDING = registry.register(Gauge(
+    "execution_history_pending", "Executions buffered for the next history write"
+))
+HISTORY_DROPPED = registry.register(Counter(
+    "execution_history_dropped_total", "Executions dropped from the history buffer"
+))
+PASSWORD_HASH_DURATION = registry.register(Histogram(
+    "password_hash_seconds", "bcrypt hash/verify time on the hashing pool", ["operation", "status"]
+))
+PASSWORD_HASH_IN_FLIGHT = registry.register(Gauge(
+    "password_hash_in_flight", "Password operations running or queued"
+))
+PASSWORD_HASH_REJECTED = registry.register(Counter(
+    "password_hash_rejected_total", "Password operations rejected with 429 because the pool was full", ["operation"]
+))
+BATCH_PENDING = registry.register(Gauge(
+    "webhook_batch_pending_events", "Webhook events buffered in open batches"
+))
+BATCH_DROPPED = registry.register(Counter(
+    "webhook_batch_dropped_events_total", "Batched webhook events dropped because their batch could not be queued"
+))
+BATCHES_FLUSHED = registry.register(Counter(
+    "webhook_batches_flushed_total", "Batches handed to the execution queue", ["reason"]
+))
+CACHE_EVENTS_APPLIED = registry.register(Counter(
+    "cache_events_applied_total", "Cache invalidations received from other processes", ["kind"]
+))
+LOG_DROPPED = registry.register(Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full"
+))
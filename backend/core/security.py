@@ -0,0 +1,212 @@
+"""
+JWT settings, the shared authentication dependency and password hashing.
+
+Verified tokens are cached until their `exp`, so repeated requests with
+the same token (dashboard polling) skip the HMAC check. User-existence
+checks are cached for AUTH_USER_CACHE_TTL seconds. bcrypt runs on its own
+small thread pool so a login storm cannot starve the other routes.
+"""
+import asyncio
+import hashlib
+import hmac
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from jose import jwt, JWTError
+from passlib.context import CryptContext
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.metrics import PASSWORD_HASH_DURATION, PASSWORD_HASH_IN_FLIGHT, PASSWORD_HASH_REJECTED
+from models.user import User
+
+# JWT settings
+SECRET_KEY = "b8f7d1a6e4c9f7b2a1d3e5f8b0c2a7d9e6f1b3c4d5a6e7f8b9c0d1e2f3a4b5c6"  # replace with env var in production
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="signin")
+
+
+def create_access_token(data: dict, expires_delta: timedelta = None):
+    to_encode = data.copy()
+    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
+    to_encode.update({"exp": expire})
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def execution_token(execution_id: int) -> str:
+    """Unguessable token for an execution's status URL: webhook callers have no JWT to show."""
+    return hmac.new(SECRET_KEY.encode(), f"execution:{execution_id}".encode(), hashlib.sha256).hexdigest()[:32]
+
+
+def check_execution_token(execution_id: int, token: str) -> bool:
+    return hmac.compare_digest(execution_token(execution_id), token or "")
+
+
+class TokenCache:
+    """LRU of verified tokens -> (user id, expiry as a unix timestamp)."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, token: str) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[token]
+                return None
+            self._entries.move_to_end(token)
+            return user_id
+
+    def put(self, token: str, user_id: int, expires_at: float) -> None:
+        with self._lock:
+            self._entries[token] = (user_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for token in [t for t, (uid, _) in self._entries.items() if uid == user_id]:
+                del self._entries[token]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class UserCache:
+    """Remembers which user ids exist, for AUTH_USER_CACHE_TTL seconds."""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._seen: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def exists(self, db: Session, user_id: int) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._seen.get(user_id, 0) > now:
+                return True
+
+        if db.query(User.id).filter(User.id == user_id).first() is None:
+            return False
+
+        with self._lock:
+            # Only existing users are remembered, so a new signup is never hidden
+            self._seen[user_id] = now + self.ttl
+            if len(self._seen) > self.max_size:
+                self._seen = {uid: exp for uid, exp in self._seen.items() if exp > now}
+        return True
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._seen.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seen.clear()
+
+
+token_cache = TokenCache(settings.AUTH_TOKEN_CACHE_SIZE)
+user_cache = UserCache(settings.AUTH_USER_CACHE_TTL, settings.AUTH_USER_CACHE_SIZE)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme)) -> int:
+    """Return the id of the authenticated user (always an int)."""
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        sub = payload.get("sub")
+        if sub is None:
+            raise HTTPException(status_code=401, detail="Invalid token")
+        user_id = int(sub)
+    except (JWTError, ValueError):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    # Tokens without an expiry are still only trusted for a bounded time
+    expires_at = payload.get("exp") or time.time() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    token_cache.put(token, user_id, float(expires_at))
+    return user_id
+
+
+def invalidate_user(user_id: int) -> None:
+    """Forget cached tokens and the existence check of one user (deleted, password changed)."""
+    token_cache.invalidate_user(user_id)
+    user_cache.invalidate(user_id)
+
+
+# -------- Password hashing -------- #
+
+class HasherBusy(Exception):
+    """Raised when the password hashing pool and its queue are full."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a dedicated, size-limited thread pool.
+
+    bcrypt releases the GIL, so `workers` threads give that many hashes in
+    parallel without touching Starlette's shared pool. At most `queue_size`
+    more requests may wait; beyond that calls fail fast with HasherBusy.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.in_flight = 0  # running + waiting; only touched on the event loop
+        self._context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    def _timed(self, operation: str, fn, *args):
+        with PASSWORD_HASH_DURATION.time(operation=operation):
+            return fn(*args)
+
+    async def _submit(self, operation: str, fn, *args):
+        if self.in_flight >= self.workers + self.queue_size:
+            PASSWORD_HASH_REJECTED.inc(operation=operation)
+            raise HasherBusy("Too many password operations in progress")
+
+        self.in_flight += 1
+        PASSWORD_HASH_IN_FLIGHT.set(self.in_flight)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), self._timed, operation, fn, *args)
+        finally:
+            self.in_flight -= 1
+            PASSWORD_HASH_IN_FLIGHT.set(self.in_flight)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", self._context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit("verify", self._context.verify, password, hashed)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_SIZE)
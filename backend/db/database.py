@@ -1,6 +1,7 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from core.config import settings
 
@@ -10,6 +11,25 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def async_database_url(url: str) -> str:
+    """Map DATABASE_URL onto the matching asyncio driver (PostgreSQL needs the `postgres` extra)."""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return url
+
+
+# Async engine for the webhook and executor hot paths; CRUD routes keep SessionLocal
+async_engine = create_async_engine(
+    async_database_url(settings.DATABASE_URL)
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -19,5 +39,13 @@ def get_db():
     finally:
         db.close()
 
+# Indexes added to tables that existing databases already have
+_ADDED_INDEXES = {"ix_workflows_user_id_id"}
+
 def create_table():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist; add indexes introduced since
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in _ADDED_INDEXES:
+                index.create(bind=engine, checkfirst=True)
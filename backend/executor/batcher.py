@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.config import settings
+from core.metrics import BATCH_DROPPED, BATCHES_FLUSHED
+from executor.plan import CompiledPlan
+from executor.queue import execution_queue
+
+logger = logging.getLogger(__name__)
+
+BatchKey = Tuple[str, str]  # (webhook path, plan version)
+
+# A batch the queue refused (full, database down) is retried with backoff
+_RETRY_DELAY = 1.0
+_RETRY_MAX_DELAY = 30.0
+
+
+class BatchFull(Exception):
+    """Raised when the batcher already holds BATCH_MAX_PENDING_EVENTS events."""
+
+
+def batch_context(events: List[dict], test_mode: bool = False) -> dict:
+    """
+    Initial context of a batched run. `webhook.events` holds every buffered
+    event (method, body, query, headers, path, received_at) and `webhook.body`
+    just their bodies, so `webhook.body.0.id` is the first event's id.
+    """
+    first = events[0]
+    return {
+        "webhook": {
+            "method": first.get("method"),
+            "path": first.get("path"),
+            "batch_size": len(events),
+            "events": events,
+            "body": [event.get("body") for event in events],
+        },
+        "test_mode": test_mode,
+    }
+
+
+@dataclass(eq=False)
+class _Batch:
+    plan: CompiledPlan
+    max_events: int
+    events: List[dict] = field(default_factory=list)
+    opened_at: float = field(default_factory=time.monotonic)
+    timer: Optional[asyncio.TimerHandle] = None
+    retries: int = 0
+
+
+class EventBatcher:
+    """
+    Coalesces bursts of webhook events into one queued execution.
+
+    Events for a workflow with a batching trigger are buffered per webhook
+    path. The first event of a batch opens a window of `batch_window_ms`;
+    the batch is handed to the execution queue as a single execution when
+    the window closes or `batch_max_events` have arrived, whichever is first.
+    Every event was already answered with 202, so a batch the queue refuses
+    is kept and retried with backoff; its events still count towards
+    `max_pending` (beyond which add() raises BatchFull). Open and retrying
+    batches get a last try on shutdown.
+    """
+
+    def __init__(self, max_pending: int, default_window_ms: int, default_max_events: int):
+        self.max_pending = max_pending
+        self.default_window_ms = default_window_ms
+        self.default_max_events = default_max_events
+        self._batches: Dict[BatchKey, _Batch] = {}
+        self._retrying: Set[_Batch] = set()
+        self._pending = 0
+        self._flushing: Set[asyncio.Task] = set()
+
+    def depth(self) -> int:
+        return self._pending
+
+    async def add(self, webhook_path: str, plan: CompiledPlan, event: dict) -> int:
+        """Buffer one event (a materialized webhook payload); returns the size of its batch so far."""
+        if self._pending >= self.max_pending:
+            raise BatchFull("Too many webhook events waiting to be batched")
+
+        key = (webhook_path, plan.version)
+        batch = self._batches.get(key)
+        if batch is None:
+            config = plan.batch
+            batch = self._batches[key] = _Batch(plan=plan, max_events=config.max_events or self.default_max_events)
+            window = (config.window_ms or self.default_window_ms) / 1000
+            batch.timer = asyncio.get_running_loop().call_later(window, self._flush_later, key)
+
+        batch.events.append(dict(event, received_at=datetime.utcnow().isoformat()))
+        self._pending += 1
+        size = len(batch.events)
+
+        if size >= batch.max_events:
+            await self._flush(key, "full")
+        return size
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    def _flush_later(self, key: BatchKey) -> None:
+        self._spawn(self._flush(key, "window"))
+
+    def _retry_later(self, batch: _Batch) -> None:
+        self._retrying.discard(batch)
+        self._spawn(self._enqueue(batch, "retry"))
+
+    async def _flush(self, key: BatchKey, reason: str) -> None:
+        # Taken out of the table before awaiting, so new events open a fresh batch
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        await self._enqueue(batch, reason)
+
+    async def _enqueue(self, batch: _Batch, reason: str, last_try: bool = False) -> None:
+        try:
+            execution_id = await execution_queue.enqueue(batch.plan, batch_context(batch.events))
+        except Exception as e:
+            if last_try:
+                self._pending -= len(batch.events)
+                BATCH_DROPPED.inc(len(batch.events))
+                logger.error("Dropped a batch of %d events for workflow %s: %s",
+                             len(batch.events), batch.plan.workflow_id, e)
+                return
+            batch.retries += 1
+            delay = min(_RETRY_DELAY * 2 ** (batch.retries - 1), _RETRY_MAX_DELAY)
+            logger.warning("Could not queue a batch of %d events for workflow %s, retrying in %.1fs: %s",
+                           len(batch.events), batch.plan.workflow_id, delay, e)
+            batch.timer = asyncio.get_running_loop().call_later(delay, self._retry_later, batch)
+            self._retrying.add(batch)
+            return
+
+        self._pending -= len(batch.events)
+        BATCHES_FLUSHED.inc(reason=reason)
+        logger.info("Queued execution %s for a batch of %d events (%s, %.0f ms)",
+                    execution_id, len(batch.events), reason, (time.monotonic() - batch.opened_at) * 1000)
+
+    async def close(self) -> None:
+        """On shutdown: let flushes underway finish, then give open and retrying batches a last try."""
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+        batches = list(self._batches.values()) + list(self._retrying)
+        self._batches.clear()
+        self._retrying.clear()
+        for batch in batches:
+            if batch.timer is not None:
+                batch.timer.cancel()
+            await self._enqueue(batch, "shutdown", last_try=True)
+
+
+event_batcher = EventBatcher(
+    max_pending=settings.BATCH_MAX_PENDING_EVENTS,
+    default_window_ms=settings.BATCH_DEFAULT_WINDOW_MS,
+    default_max_events=settings.BATCH_DEFAULT_MAX_EVENTS,
+)
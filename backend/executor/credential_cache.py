@@ -0,0 +1,74 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple, Type
+
+from pydantic import BaseModel
+
+from core.config import settings
+
+
+class CredentialCache:
+    """
+    TTL + LRU cache of validated node credentials (EmailCredential,
+    TelegramCredential, ...) keyed by credential id.
+
+    Entries expire after `ttl` seconds and are dropped explicitly when a
+    credential is created or deleted through the credential router.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[BaseModel, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, credential_id, schema: Type[BaseModel]) -> Optional[BaseModel]:
+        key = str(credential_id)
+        with self._lock:
+            creds = self._lookup(key, schema)
+            if creds is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return creds
+
+    def peek(self, credential_id, schema: Type[BaseModel]) -> Optional[BaseModel]:
+        """Like get(), without counting a hit or miss or refreshing the LRU position."""
+        with self._lock:
+            return self._lookup(str(credential_id), schema)
+
+    def _lookup(self, key: str, schema: Type[BaseModel]) -> Optional[BaseModel]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            creds, expires_at = entry
+            if expires_at > time.monotonic() and isinstance(creds, schema):
+                return creds
+            del self._entries[key]
+        return None
+
+    def put(self, credential_id, creds: BaseModel) -> None:
+        key = str(credential_id)
+        with self._lock:
+            self._entries[key] = (creds, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, credential_id) -> None:
+        with self._lock:
+            self._entries.pop(str(credential_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+credential_cache = CredentialCache(settings.CREDENTIAL_CACHE_SIZE, settings.CREDENTIAL_CACHE_TTL)
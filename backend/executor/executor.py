@@ -1,48 +1,121 @@
 import asyncio
+import logging
 import os
+import re
 import smtplib
+from collections.abc import Mapping
+from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from telegram import Bot
 from dotenv import load_dotenv
+from email_validator import validate_email, EmailNotValidError
+from telegram.error import RetryAfter
 
-from sqlalchemy.orm import Session
 from sqlalchemy import select
 from pathlib import Path
 import sys
+from contextvars import ContextVar
+from typing import Optional
 
 # Add the backend folder to sys.path
 sys.path.append(str(Path(__file__).resolve().parent.parent))
 from schema_cred_data.email_cred_val import EmailCredential
 from schema_cred_data.tele_cred_val import TelegramCredential
 from models.credentials import Credentials
-from schemas.workflow import WorkflowResponse
+from db.database import AsyncSessionLocal
+from executor.credential_cache import credential_cache
+from executor.transports import Transports, transports_for
+from executor.payload import LazyJSON, preload
+from executor.retry import NodeTimeout, TransientError, backoff_delay, is_transient
+from executor.rate_limit import rate_limiter, acquire_email, acquire_telegram, email_key, telegram_key
+from core.config import settings
+from core.log import log_context
+from core.metrics import (
+    DB_DURATION, NODE_DURATION, NODES_IN_FLIGHT, SEND_DURATION, WORKFLOW_DURATION, WORKFLOWS_IN_FLIGHT,
+)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # -------- Node Implementations -------- #
 
-async def trigger_node(node_data: dict, context: dict, db: Session = None):
-    print(f"Trigger activated: {node_data}")
+async def trigger_node(node_data: dict, context: dict):
+    logger.debug("Trigger activated: %s", node_data)
     return {"triggered": True}
 
 
-def get_email_credentials(db: Session, id: str) -> EmailCredential:
-    stmt = select(Credentials).where(Credentials.id == id)
-    result = db.execute(stmt).scalars().first()
+async def get_email_credentials(id: str) -> EmailCredential:
+    # Peeked: prefetch_credentials already counted this run's hit or miss
+    creds = credential_cache.peek(id, EmailCredential)
+    if creds:
+        return creds
+
+    # Own short-lived session: sibling nodes look up credentials concurrently
+    with DB_DURATION.time(operation="credential_lookup"):
+        async with AsyncSessionLocal() as db:
+            stmt = select(Credentials).where(Credentials.id == id)
+            result = (await db.execute(stmt)).scalars().first()
 
     if not result:
         raise ValueError("❌ Email credentials not found in DB")
 
-    return EmailCredential(**result.data)
+    creds = EmailCredential(**result.data)
+    credential_cache.put(id, creds)
+    return creds
+
+
+def resolve_path(context: dict, path: str):
+    """Follow a dotted path ("webhook.body.users.0.email") through dicts and lists."""
+    value = context
+    for part in path.split("."):
+        if isinstance(value, LazyJSON):
+            # First reference to the webhook body parses it (once per run)
+            value = value.value
+        if isinstance(value, Mapping):
+            value = value.get(part)
+        elif isinstance(value, list) and part.isdigit() and int(part) < len(value):
+            value = value[int(part)]
+        else:
+            return None
+    if isinstance(value, LazyJSON):
+        value = value.value
+    return value
+
+
+_placeholder = re.compile(r"{{\s*([\w.]+)\s*}}")
 
 
-async def email_node(node_data: dict, context: dict, db: Session):
+def render_template(template: str, values: dict) -> str:
+    """Fill {{ field }} placeholders from values; unknown fields are left as-is."""
+    def _fill(match):
+        value = resolve_path(values, match.group(1))
+        return match.group(0) if value is None else str(value)
+
+    return _placeholder.sub(_fill, template or "")
+
+
+def _build_email(from_email: str, to_email: str, subject: str, message: str) -> MIMEMultipart:
+    msg = MIMEMultipart()
+    msg["From"] = from_email
+    msg["To"] = to_email
+    msg["Subject"] = subject
+    msg.attach(MIMEText(message, "plain"))
+    return msg
+
+
+async def email_node(node_data: dict, context: dict):
     credential_id = node_data.get("credential_id")
     if not credential_id:
         raise ValueError("❌ credential_id is required in node_data for email node")
 
-    creds = get_email_credentials(db, credential_id)
+    creds = await get_email_credentials(credential_id)
+
+    # Real pooled SMTP, or the recording fake for test runs
+    transport = transports_for(context)
+
+    if node_data.get("recipients") or node_data.get("recipients_path"):
+        return await _send_email_batch(node_data, context, creds, credential_id, transport)
 
     from_email = creds.from_email
     app_password = creds.app_password
@@ -50,152 +123,495 @@ async def email_node(node_data: dict, context: dict, db: Session):
     subject = node_data.get("subject", "No Subject")
     message = node_data.get("body", "")
 
-    def _send_email():  # ✅ regular function now
-        smtp_server = "smtp.gmail.com"
-        smtp_port = 587
-
-        msg = MIMEMultipart()
-        msg["From"] = from_email
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        msg.attach(MIMEText(message, "plain"))
-
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(from_email, app_password)
-        server.sendmail(from_email, to_email, msg.as_string())
-        server.quit()
+    msg = _build_email(from_email, to_email, subject, message)
 
     try:
-        # ✅ offload blocking SMTP work to thread
-        await asyncio.to_thread(_send_email)
-        print(f"✅ Email sent to {to_email}")
+        if transport.paced:
+            await _paced(acquire_email(credential_id))
+        # ✅ reuses an authenticated session from the SMTP pool
+        with SEND_DURATION.time(platform="email"):
+            await transport.smtp.send(creds.smtp_host, creds.smtp_port, from_email, app_password, to_email, msg.as_string())
+        logger.info("Email sent", extra={"to": to_email, "transport": transport.name})
         return {"email_status": "sent", "to": to_email}
     except Exception as e:
-        print(f"❌ Error sending email: {e}")
-        return {"email_status": "failed", "error": str(e)}
+        _note_smtp_throttle(credential_id, e)
+        logger.warning("Error sending email: %s", e, extra={"to": to_email})
+        result = {"email_status": "failed", "error": str(e)}
+        if is_transient(e):
+            raise TransientError(str(e), result) from e
+        return result
+
+
+def _note_smtp_throttle(credential_id: str, error: Exception) -> None:
+    """Hold further sends for this credential when the server says we are sending too fast."""
+    if isinstance(error, smtplib.SMTPResponseException) and error.smtp_code in (421, 450, 451):
+        logger.warning(
+            "SMTP throttled credential %s, pausing %ss", credential_id, settings.EMAIL_THROTTLE_PAUSE
+        )
+        rate_limiter.pause(email_key(credential_id), settings.EMAIL_THROTTLE_PAUSE)
+
+
+async def _send_email_batch(node_data: dict, context: dict, creds: EmailCredential, credential_id: str,
+                            transport: Transports):
+    """
+    Batch mode: one message per recipient, all sent over a single SMTP session.
+
+    Recipients come from `recipients` and/or the list found at `recipients_path`
+    in the context. Entries may be plain addresses or objects with an "email"
+    field; the object's fields fill {{ field }} placeholders in subject and body.
+    """
+    recipients = list(node_data.get("recipients") or [])
+
+    path = node_data.get("recipients_path")
+    if path:
+        await preload(context)
+        found = resolve_path(context, path)
+        if found is None:
+            raise ValueError(f"❌ No recipients found at '{path}'")
+        recipients.extend(found if isinstance(found, list) else [found])
+
+    if len(recipients) > settings.EMAIL_BATCH_MAX_RECIPIENTS:
+        raise ValueError(f"❌ Too many recipients ({len(recipients)} > {settings.EMAIL_BATCH_MAX_RECIPIENTS})")
+
+    report = []
+    messages = []
+    for entry in recipients:
+        values = entry if isinstance(entry, dict) else {"email": entry}
+        to_email = values.get("email") or values.get("to_email")
+        try:
+            to_email = validate_email(str(to_email), check_deliverability=False).normalized
+        except EmailNotValidError as e:
+            report.append({"to": to_email, "status": "failed", "error": str(e)})
+            continue
+
+        try:
+            subject = render_template(node_data.get("subject") or "No Subject", values)
+            body = render_template(node_data.get("body", ""), values)
+            message = _build_email(creds.from_email, to_email, subject, body).as_string()
+        except Exception as e:
+            # e.g. a field with a newline put into the subject (HeaderParseError): skip just this one
+            report.append({"to": to_email, "status": "failed", "error": str(e)})
+            continue
+
+        report.append({"to": to_email, "status": "sent"})
+        messages.append((to_email, message))
+
+    # Paced in chunks of at most one burst; a throttled chunk holds back the next ones
+    errors = []
+    chunk_size = settings.EMAIL_RATE_BURST
+    for start in range(0, len(messages), chunk_size):
+        chunk = messages[start:start + chunk_size]
+        try:
+            if transport.paced:
+                await _paced(acquire_email(credential_id, len(chunk)))
+            with SEND_DURATION.time(platform="email_batch"):
+                chunk_errors = await transport.smtp.send_many(
+                    creds.smtp_host, creds.smtp_port, creds.from_email, creds.app_password, chunk
+                )
+        except Exception as e:
+            logger.warning("Error sending email batch: %s", e)
+            chunk_errors = [e] * len(chunk)
+
+        for error in chunk_errors:
+            if error:
+                _note_smtp_throttle(credential_id, error)
+        errors.extend(chunk_errors)
+
+    # Errors line up with the entries that were actually handed to SMTP
+    queued = (item for item in report if item["status"] == "sent")
+    for item, error in zip(queued, errors):
+        if error:
+            item.update(status="failed", error=str(error))
+
+    sent = sum(1 for item in report if item["status"] == "sent")
+    failed = len(report) - sent
+    logger.info("Email batch: %d sent, %d failed", sent, failed)
 
+    status = "sent" if not failed else ("failed" if not sent else "partial")
+    result = {"email_status": status, "sent": sent, "failed": failed, "recipients": report}
 
-def get_telegram_credentials(db: Session, id: str) -> TelegramCredential:
-    stmt = select(Credentials).where(Credentials.id == id)
-    result = db.execute(stmt).scalars().first()
+    # Only a batch where nothing went out may be retried; anything else would send twice
+    if errors and not sent and all(is_transient(e) for e in errors):
+        raise TransientError(str(errors[0]), result)
+    return result
+
+
+async def get_telegram_credentials(id: str) -> TelegramCredential:
+    # Peeked: prefetch_credentials already counted this run's hit or miss
+    creds = credential_cache.peek(id, TelegramCredential)
+    if creds:
+        return creds
+
+    # Own short-lived session: sibling nodes look up credentials concurrently
+    with DB_DURATION.time(operation="credential_lookup"):
+        async with AsyncSessionLocal() as db:
+            stmt = select(Credentials).where(Credentials.id == id)
+            result = (await db.execute(stmt)).scalars().first()
 
     if not result:
         raise ValueError("❌ Telegram credentials not found in DB")
 
-    return TelegramCredential(**result.data)
+    creds = TelegramCredential(**result.data)
+    credential_cache.put(id, creds)
+    return creds
 
 
-async def telegram_node(node_data: dict, context: dict, db: Session):
+async def telegram_node(node_data: dict, context: dict):
     credential_id = node_data.get("credential_id")
     if not credential_id:
         raise ValueError("❌ credential_id is required in node_data for telegram node")
 
-    creds = get_telegram_credentials(db, credential_id)
+    creds = await get_telegram_credentials(credential_id)
 
     access_token = creds.access_token
     chat_id = int(node_data.get("chat_id"))
     message = node_data.get("message", "")
+    transport = transports_for(context)
 
     try:
-        bot = Bot(token=access_token)
-        # ✅ Bot.send_message is async → await directly
-        await bot.send_message(chat_id=chat_id, text=message)
-        print(f"✅ Telegram message sent to chat_id {chat_id}")
+        for attempt in range(settings.TELEGRAM_MAX_RETRIES + 1):
+            if transport.paced:
+                await _paced(acquire_telegram(credential_id, chat_id))
+            try:
+                # ✅ shared Bot per token, keeps its HTTP connections alive between sends
+                with SEND_DURATION.time(platform="telegram"):
+                    async with transport.telegram.bot(access_token) as bot:
+                        await bot.send_message(chat_id=chat_id, text=message)
+                break
+            except RetryAfter as e:
+                wait = e.retry_after.total_seconds() if isinstance(e.retry_after, timedelta) else float(e.retry_after)
+                if attempt == settings.TELEGRAM_MAX_RETRIES or wait > settings.TELEGRAM_MAX_RETRY_AFTER:
+                    raise
+                # Flood control applies to the whole bot; hold every send on it
+                logger.warning("Telegram asked to retry after %ss", wait)
+                rate_limiter.pause(telegram_key(credential_id), wait)
+        logger.info("Telegram message sent", extra={"chat_id": chat_id, "transport": transport.name})
         return {"telegram_status": "sent", "chat_id": chat_id}
     except Exception as e:
-        print(f"❌ Error sending Telegram message: {e}")
-        return {"telegram_status": "failed", "error": str(e)}
+        logger.warning("Error sending Telegram message: %s", e, extra={"chat_id": chat_id})
+        result = {"telegram_status": "failed", "error": str(e)}
+        if is_transient(e):
+            raise TransientError(str(e), result) from e
+        return result
 
 
 # -------- Workflow Executor -------- #
 
-from collections import defaultdict, deque
-from sqlalchemy.orm import Session
-from schemas.workflow import WorkflowResponse
+from executor.plan import CompiledPlan, PlanCache, PlanNode, compile_plan, plan_version
+
+node_map = {
+    "trigger": trigger_node,
+    "email": email_node,
+    "telegram": telegram_node,
+}
+
+plan_cache = PlanCache(settings.PLAN_CACHE_SIZE)
+
+# Credential schema each platform's handler expects
+credential_schemas = {
+    "email": EmailCredential,
+    "telegram": TelegramCredential,
+}
+
+
+def get_plan(workflow) -> CompiledPlan:
+    """Return the compiled plan for a Workflow row, compiling it on a cache miss."""
+    version = plan_version(workflow.nodes, workflow.connections)
+    plan = plan_cache.get(workflow.id, version)
+    if plan is None:
+        plan = compile_plan(workflow.id, workflow.nodes, workflow.connections, node_map)
+        plan_cache.put(plan)
+    return plan
+
+
+def refresh_plan(workflow) -> CompiledPlan:
+    """Drop cached plans of a saved workflow and compile its current version."""
+    plan_cache.invalidate(workflow.id)
+    try:
+        return get_plan(workflow)
+    except ValueError as e:
+        # Keep saving lenient; the error surfaces again when the webhook runs
+        logger.warning("Workflow %s could not be compiled: %s", workflow.id, e)
+        return None
+
 
-async def execute_workflow(workflow_data: WorkflowResponse, db: Session, initial_context: dict = None):
+async def prefetch_credentials(plan: CompiledPlan) -> None:
     """
-    Execute a workflow by processing nodes in topological order.
-    
-    Args:
-        workflow_data: The workflow to execute
-        db: Database session
-        initial_context: Optional initial context (e.g., webhook request data)
+    Load every credential the plan needs in one short-lived session, before
+    any node runs, so no connection is held while nodes wait on SMTP/Telegram.
+    Handlers then resolve them from the credential cache.
     """
-    node_map = {
-        "trigger": trigger_node,
-        "email": email_node,
-        "telegram": telegram_node,
-    }
+    wanted = {}
+    for node in plan.nodes.values():
+        schema = credential_schemas.get(node.platform)
+        credential_id = node.data.get("credential_id")
+        # The run's one counted lookup per node; handlers only peek afterwards
+        if schema and credential_id and credential_cache.get(credential_id, schema) is None:
+            wanted[str(credential_id)] = schema
+
+    if not wanted:
+        return
+
+    ids = [int(cid) for cid in wanted if str(cid).isdigit()]
+    with DB_DURATION.time(operation="prefetch_credentials"):
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(Credentials).where(Credentials.id.in_(ids)))).scalars().all()
+
+    for row in rows:
+        try:
+            credential_cache.put(row.id, wanted[str(row.id)](**row.data))
+        except ValueError:
+            # Leave it to the handler to report the invalid credential
+            pass
 
-    # Handle empty nodes
-    if not workflow_data.nodes:
-        return {"status": "completed", "message": "No nodes to execute"}
 
-    nodes = {node.id: node for node in workflow_data.nodes}
-    connections = workflow_data.connections or []
+# Caps how many node handlers run at once across every execution in this process
+_global_limit = None
 
-    # Step 1: Build adjacency list (graph)
-    graph = defaultdict(list)
-    in_degree = {node.id: 0 for node in workflow_data.nodes}
 
-    for conn in connections:
-        graph[conn.source].append(conn.target)
-        in_degree[conn.target] += 1
+def _get_global_limit() -> asyncio.Semaphore:
+    global _global_limit
+    if _global_limit is None:
+        _global_limit = asyncio.Semaphore(settings.EXECUTOR_MAX_CONCURRENCY)
+    return _global_limit
 
-    # Step 2: Find start nodes (in-degree = 0, usually trigger)
-    queue = deque([nid for nid, deg in in_degree.items() if deg == 0])
 
-    if not queue:
-        raise ValueError("❌ No start node found (check workflow connections)")
+class _NodeSlot:
+    """The executor slots (per-run and process-wide) and the deadline of one node attempt."""
 
-    # Initialize context with incoming data (webhook payload, etc.)
-    context = initial_context.copy() if initial_context else {}
-    executed_nodes = []
+    def __init__(self, limits: tuple, timeout: Optional[float]):
+        self.limits = limits
+        self.timeout = timeout
+        self.deadline: Optional[asyncio.Timeout] = None
+        self.held = []
 
-    # Step 3: Process nodes in topological order
-    while queue:
-        node_id = queue.popleft()
-        node = nodes[node_id]
+    async def acquire(self) -> None:
+        for limit in self.limits:
+            await limit.acquire()
+            self.held.append(limit)
 
-        node_type = node.platform
-        node_data = dict(node.data) if node.data else {}
+    def release(self) -> None:
+        while self.held:
+            self.held.pop().release()
 
-        if getattr(node, "credential_id", None):
-            node_data["credential_id"] = node.credential_id
 
-        print(f"\n🚀 Executing node: {node.name} ({node_type})")
+_node_slot: ContextVar[Optional[_NodeSlot]] = ContextVar("node_slot", default=None)
 
-        handler = node_map.get(node_type)
-        if not handler:
-            print(f"⚠️ No handler for node platform: {node_type}")
-            executed_nodes.append({"id": node_id, "name": node.name, "status": "skipped"})
-            continue
 
-        try:
-            result = await handler(node_data, context, db)
-            context.update(result or {})
-            executed_nodes.append({"id": node_id, "name": node.name, "status": "success"})
-        except Exception as e:
-            print(f"❌ Error executing node {node.name}: {e}")
-            executed_nodes.append({"id": node_id, "name": node.name, "status": "error", "error": str(e)})
-            raise
+async def _paced(wait) -> None:
+    """
+    Wait for a rate-limit token (`wait` is an acquire_* coroutine) without
+    holding executor slots, so paced or paused sends don't starve other runs.
+    The wait doesn't count against the node timeout, which starts over once
+    the token is in: it bounds the work between waits (one send, or one
+    chunk of a batch), not how long the provider limits make a node last.
+    """
+    slot = _node_slot.get()
+    if slot is None:
+        await wait
+        return
+    slot.release()
+    if slot.deadline is not None:
+        slot.deadline.reschedule(None)
+    await wait
+    await slot.acquire()
+    if slot.deadline is not None and slot.timeout:
+        slot.deadline.reschedule(asyncio.get_running_loop().time() + slot.timeout)
+
+
+class NodeSkipped(Exception):
+    """Raised when a node has no handler for its platform."""
+
+
+class WorkflowExecutionError(Exception):
+    """A node failed; carries the per-node records of the run up to that point."""
+
+    def __init__(self, message: str, executed_nodes: list):
+        super().__init__(message)
+        self.executed_nodes = executed_nodes
+
+
+async def _attempt_node(plan: CompiledPlan, node: PlanNode, context: dict, run_limit: asyncio.Semaphore):
+    """
+    One attempt of a node's handler, cancelled (along with its send) after the
+    node's timeout; time spent waiting on rate limits is not counted (see _paced).
+    """
+    timeout = node.policy.timeout or settings.NODE_TIMEOUT_SECONDS or None
+    slot = _NodeSlot((run_limit, _get_global_limit()), timeout)
+    token = _node_slot.set(slot)
+    try:
+        await slot.acquire()
+        logger.debug("Executing node %s (%s)", node.name, node.platform, extra={"node_id": node.id})
+        with NODES_IN_FLIGHT.track(platform=node.platform), \
+                NODE_DURATION.time(workflow_id=plan.workflow_id, platform=node.platform):
+            try:
+                async with asyncio.timeout(timeout) as slot.deadline:
+                    return await node.handler(node.data, context)
+            except TimeoutError:
+                if not slot.deadline.expired():
+                    raise
+                raise NodeTimeout(f"❌ Node timed out after {timeout}s") from None
+    finally:
+        _node_slot.reset(token)
+        slot.release()
+
+
+async def _run_node(plan: CompiledPlan, node: PlanNode, context: dict, run_limit: asyncio.Semaphore, timings: dict):
+    """
+    Run a node under its policy: a TransientError from the handler is retried
+    up to `policy.retries` times with backoff, without holding a concurrency
+    slot while waiting. Only the handler knows whether nothing was sent, so
+    nothing else is retried, node timeouts included. Once retries run out,
+    the TransientError's fallback result becomes the node's result.
+    """
+    if not node.handler:
+        logger.warning("No handler for node platform: %s", node.platform)
+        raise NodeSkipped(node.platform)
+
+    policy = node.policy
+    started_at = datetime.utcnow()
+    try:
+        for attempt in range(1, policy.retries + 2):
+            try:
+                return await _attempt_node(plan, node, context, run_limit)
+            except TransientError as e:
+                if attempt > policy.retries:
+                    return e.result
+                delay = backoff_delay(policy, attempt)
+                logger.warning("Node %s failed (%s), retry %d/%d in %.2fs",
+                               node.name, e, attempt, policy.retries, delay, extra={"node_id": node.id})
+            await asyncio.sleep(delay)
+    finally:
+        timings[node.id] = (started_at, datetime.utcnow())
+
+
+async def execute_workflow(plan: CompiledPlan, initial_context: dict = None):
+    """
+    Execute a compiled workflow plan, recording its duration and outcome
+    under workflow_execution_seconds. See _execute_plan.
+    """
+    with log_context(workflow_id=plan.workflow_id), \
+            WORKFLOWS_IN_FLIGHT.track(workflow_id=plan.workflow_id), \
+            WORKFLOW_DURATION.time(workflow_id=plan.workflow_id):
+        return await _execute_plan(plan, initial_context)
 
-        # Step 4: Update in-degree of neighbors
-        for neighbor in graph[node_id]:
-            in_degree[neighbor] -= 1
-            if in_degree[neighbor] == 0:
-                queue.append(neighbor)
+
+async def _execute_plan(plan: CompiledPlan, initial_context: dict = None):
+    """
+    Execute a compiled workflow plan as a dependency graph.
+
+    Each node starts as soon as all of its upstream nodes have succeeded, so
+    a slow branch only delays its own descendants. Node handlers are bounded
+    by EXECUTOR_MAX_CONCURRENCY_PER_RUN and the process-wide
+    EXECUTOR_MAX_CONCURRENCY, except while they wait on a rate limit. Each
+    node sees the initial context plus the results of its upstream nodes,
+    merged in plan order (topological, then declaration); the returned
+    context and node records are in plan order too, so none of them depend
+    on which node happened to finish first.
+
+    On the first node error, EXECUTOR_FAILURE_MODE "cancel" cancels the nodes
+    still running, while "finish" lets them complete; either way no new
+    nodes are started.
+
+    Args:
+        plan: The compiled workflow to execute (see get_plan)
+        initial_context: Optional initial context (e.g., webhook request data)
+    """
+    # Handle empty nodes
+    if not plan.nodes:
+        return {"status": "completed", "message": "No nodes to execute"}
+
+    if not plan.levels:
+        raise ValueError("❌ No start node found (check workflow connections)")
+
+    await prefetch_credentials(plan)
+
+    # Initial context: incoming data (webhook payload, etc.)
+    base = initial_context.copy() if initial_context else {}
+    order = [nid for level in plan.levels for nid in level]
+    position = {nid: index for index, nid in enumerate(order)}
+    waiting_on = {nid: len(plan.parents[nid]) for nid in order}
+    outputs = {}
+    ancestors = {}  # node id -> ids of every upstream node
+    entries = {}
+    timings = {}
+    running = {}  # task -> node
+    error = None
+    run_limit = asyncio.Semaphore(settings.EXECUTOR_MAX_CONCURRENCY_PER_RUN)
+
+    def start(nid: str) -> None:
+        node = plan.nodes[nid]
+        upstream = set(plan.parents[nid])
+        for parent in plan.parents[nid]:
+            upstream |= ancestors[parent]
+        ancestors[nid] = upstream
+        context = dict(base)
+        for uid in sorted(upstream, key=position.get):
+            context.update(outputs[uid])
+        running[asyncio.create_task(_run_node(plan, node, context, run_limit, timings))] = node
+
+    for nid in plan.levels[0]:
+        start(nid)
+
+    try:
+        while running:
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+            # Nodes finishing together are handled in plan order
+            for task in sorted(done, key=lambda t: position[running[t].id]):
+                node = running.pop(task)
+                if task.cancelled():
+                    outcome = asyncio.CancelledError()
+                else:
+                    outcome = task.exception() or task.result()
+
+                entry = {"id": node.id, "name": node.name}
+                if node.id in timings:
+                    started_at, finished_at = timings[node.id]
+                    entry.update(
+                        started_at=started_at.isoformat(),
+                        finished_at=finished_at.isoformat(),
+                        duration_ms=round((finished_at - started_at).total_seconds() * 1000, 2),
+                    )
+                entries[node.id] = entry
+
+                if isinstance(outcome, NodeSkipped):
+                    entry["status"] = "skipped"
+                elif isinstance(outcome, asyncio.CancelledError):
+                    entry["status"] = "cancelled"
+                elif isinstance(outcome, BaseException):
+                    logger.error("Error executing node %s: %s", node.name, outcome, extra={"node_id": node.id})
+                    entry.update(status="error", error=str(outcome))
+                    if error is None:
+                        error = outcome
+                        if settings.EXECUTOR_FAILURE_MODE == "cancel":
+                            for other in running:
+                                other.cancel()
+                else:
+                    outputs[node.id] = outcome or {}
+                    entry["status"] = "success"
+                    for child in plan.edges[node.id]:
+                        waiting_on[child] -= 1
+                        if waiting_on[child] == 0 and error is None:
+                            start(child)
+    finally:
+        # Only left non-empty if this run itself was cancelled
+        for task in running:
+            task.cancel()
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+
+    executed_nodes = [entries[nid] for nid in order if nid in entries]
+    if error:
+        raise WorkflowExecutionError(str(error), executed_nodes) from error
+
+    # Rebuilt in plan order, so a key written by two nodes doesn't depend on which finished last
+    final = dict(base)
+    for nid in order:
+        final.update(outputs.get(nid, {}))
 
     return {
         "status": "completed",
         "executed_nodes": executed_nodes,
-        "context": {k: v for k, v in context.items() if k != "webhook"}
+        "context": {k: v for k, v in final.items() if k != "webhook"}
     }
-
-
-if __name__ == "__main__":
-    from db.database import SessionLocal
-    db = SessionLocal()
-    asyncio.run(execute_workflow(workflow_data, db))
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import List, Optional
+
+from sqlalchemy import bindparam, insert, update
+
+from core.config import settings
+from core.metrics import DB_DURATION, HISTORY_DROPPED
+from db.database import AsyncSessionLocal
+from models.execution import Execution
+from models.workflow import Workflow
+
+logger = logging.getLogger(__name__)
+
+
+# executemany-friendly; unlike an ORM bulk update it tolerates workflows deleted meanwhile
+_touch_workflow = (
+    update(Workflow.__table__)
+    .where(Workflow.__table__.c.id == bindparam("wid"))
+    .values(last_executed_at=bindparam("ts"))
+)
+
+
+class HistoryBuffer:
+    """
+    Write-behind buffer for execution history.
+
+    Webhooks that run their workflow inline hand the finished execution to
+    `record()`, which only appends to a list. A background task writes the
+    buffered executions with one bulk INSERT (plus one bulk UPDATE of
+    Workflow.last_executed_at) every `max_batch` records or `flush_interval_ms`,
+    whichever comes first. Remaining records are flushed on shutdown.
+    """
+
+    def __init__(self, max_batch: int, flush_interval_ms: int, max_pending: int):
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self._pending: List[dict] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    def record(self, execution: dict) -> None:
+        """Queue one finished execution (column values of an Execution row)."""
+        if len(self._pending) >= self.max_pending:
+            # The database is not keeping up; drop the oldest rather than grow without bound
+            self._pending.pop(0)
+            HISTORY_DROPPED.inc()
+        self._pending.append(execution)
+
+        if len(self._pending) >= self.max_batch and self._wakeup is not None:
+            self._wakeup.set()
+
+    def depth(self) -> int:
+        return len(self._pending)
+
+    async def start(self) -> None:
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # Not cancelled: a flush mid-write would lose the batch it already took out of _pending
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Could not write execution history: %s", e)
+
+    async def flush(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+
+            # Latest successful run per workflow
+            last_executed = {}
+            for row in batch:
+                if row.get("status") == "success" and row.get("workflow_id"):
+                    wid = row["workflow_id"]
+                    last_executed[wid] = max(last_executed.get(wid, row["finished_at"]), row["finished_at"])
+
+            try:
+                with DB_DURATION.time(operation="history_flush"):
+                    await self._write_batch(batch, last_executed)
+            except asyncio.CancelledError:
+                # Not written (the transaction rolls back): keep it for the next flush
+                self._pending[:0] = batch
+                raise
+            except Exception as e:
+                # One bad row (e.g. its workflow was deleted meanwhile) must not
+                # poison the whole batch: retry row by row and drop what still fails
+                logger.warning("Bulk history write failed, retrying row by row: %s", e)
+                await self._write_rows(batch)
+
+    async def _write_batch(self, batch: List[dict], last_executed: dict) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(insert(Execution), batch)
+            if last_executed:
+                await db.execute(_touch_workflow, [{"wid": wid, "ts": ts} for wid, ts in last_executed.items()])
+            await db.commit()
+
+    async def _write_rows(self, batch: List[dict]) -> None:
+        for row in batch:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(insert(Execution), [row])
+                    if row.get("status") == "success":
+                        await db.execute(_touch_workflow, [{"wid": row["workflow_id"], "ts": row["finished_at"]}])
+                    await db.commit()
+            except Exception as e:
+                HISTORY_DROPPED.inc()
+                logger.error("Dropped history of workflow %s: %s", row.get("workflow_id"), e)
+
+
+history = HistoryBuffer(
+    max_batch=settings.HISTORY_FLUSH_RECORDS,
+    flush_interval_ms=settings.HISTORY_FLUSH_INTERVAL_MS,
+    max_pending=settings.HISTORY_MAX_PENDING,
+)
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from core.config import settings
+from db.database import AsyncSessionLocal
+from models.idempotency import IdempotencyKey
+from executor.plan import IdempotencyConfig
+from executor.executor import resolve_path
+
+Key = Tuple[int, str]                  # (workflow_id, key hash)
+StoredResponse = Tuple[int, dict]      # (status code, JSON body)
+
+
+class IdempotencyInProgress(Exception):
+    """The same key is still being executed (by another process, or for longer than IDEMPOTENCY_WAIT_SECONDS)."""
+
+
+def idempotency_key(config: IdempotencyConfig, headers, context: dict) -> Optional[str]:
+    """
+    Derive the dedup key for one webhook call, or None when the call carries
+    no key (header missing, or none of the body fields present).
+    """
+    if config.header:
+        value = headers.get(config.header)
+        if value:
+            return hashlib.sha256(f"header:{value}".encode()).hexdigest()
+
+    if config.fields:
+        values = [resolve_path(context, f"webhook.body.{field}") for field in config.fields]
+        if any(v is not None for v in values):
+            raw = json.dumps(values, sort_keys=True, default=str)
+            return hashlib.sha256(f"fields:{raw}".encode()).hexdigest()
+
+    return None
+
+
+class IdempotencyStore:
+    """
+    Remembers the response of each (workflow, key) for a TTL.
+
+    claim() either returns the stored response of an earlier call, or
+    reserves the key for the caller, who must then complete() it with the
+    response or release() it when the run failed (so a retry may run again).
+    Concurrent duplicates in this process wait for the first call to finish.
+    With IDEMPOTENCY_SHARED, keys are also recorded in the idempotency_keys
+    table so duplicates hitting other API processes are caught as well.
+    """
+
+    def __init__(self, max_size: int, ttl: int, shared: bool = False):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.shared = shared
+        self._done: "OrderedDict[Key, Tuple[float, StoredResponse]]" = OrderedDict()
+        self._pending: Dict[Key, asyncio.Future] = {}
+        self._shared_claims = 0
+
+    def _lookup(self, key: Key) -> Optional[StoredResponse]:
+        entry = self._done.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= time.monotonic():
+            del self._done[key]
+            return None
+        self._done.move_to_end(key)
+        return response
+
+    def _remember(self, key: Key, response: StoredResponse, ttl: int) -> None:
+        self._done[key] = (time.monotonic() + ttl, response)
+        self._done.move_to_end(key)
+        while len(self._done) > self.max_size:
+            self._done.popitem(last=False)
+
+    async def claim(self, workflow_id: int, key: str, ttl: int = None) -> Optional[StoredResponse]:
+        ttl = ttl or self.ttl
+        k = (workflow_id, key)
+        while True:
+            stored = self._lookup(k)
+            if stored is not None:
+                return stored
+            pending = self._pending.get(k)
+            if pending is None:
+                break
+            # Same key already running here: wait for it, then look again
+            try:
+                await asyncio.wait_for(asyncio.shield(pending), settings.IDEMPOTENCY_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                raise IdempotencyInProgress("Duplicate request is being processed") from None
+
+        self._pending[k] = asyncio.get_running_loop().create_future()
+        if not self.shared:
+            return None
+
+        try:
+            stored = await self._claim_shared(workflow_id, key)
+        except BaseException:
+            self._resolve(k)
+            raise
+        if stored is not None:
+            self._remember(k, stored, ttl)
+            self._resolve(k)
+        return stored
+
+    async def complete(self, workflow_id: int, key: str, status_code: int, body: dict, ttl: int = None) -> None:
+        ttl = ttl or self.ttl
+        k = (workflow_id, key)
+        self._remember(k, (status_code, body), ttl)
+        try:
+            if self.shared:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(IdempotencyKey)
+                        .where(IdempotencyKey.workflow_id == workflow_id, IdempotencyKey.key == key)
+                        .values(
+                            status="done",
+                            status_code=status_code,
+                            response=body,
+                            expires_at=datetime.utcnow() + timedelta(seconds=ttl),
+                        )
+                    )
+                    await db.commit()
+        finally:
+            self._resolve(k)
+
+    async def release(self, workflow_id: int, key: str) -> None:
+        k = (workflow_id, key)
+        try:
+            if self.shared:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        delete(IdempotencyKey)
+                        .where(IdempotencyKey.workflow_id == workflow_id, IdempotencyKey.key == key)
+                    )
+                    await db.commit()
+        finally:
+            self._resolve(k)
+
+    def _resolve(self, key: Key) -> None:
+        pending = self._pending.pop(key, None)
+        if pending is not None and not pending.done():
+            pending.set_result(None)
+
+    async def _claim_shared(self, workflow_id: int, key: str) -> Optional[StoredResponse]:
+        now = datetime.utcnow()
+        self._shared_claims += 1
+        async with AsyncSessionLocal() as db:
+            # An expired record (or a "running" one left by a crashed process) no longer counts.
+            # Every so often sweep all expired records, not just this key's.
+            expired = IdempotencyKey.expires_at < now
+            if self._shared_claims % 1000:
+                expired = expired & (IdempotencyKey.workflow_id == workflow_id) & (IdempotencyKey.key == key)
+            await db.execute(delete(IdempotencyKey).where(expired))
+            db.add(IdempotencyKey(
+                workflow_id=workflow_id,
+                key=key,
+                status="running",
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+            ))
+            try:
+                await db.commit()
+                return None
+            except IntegrityError:
+                await db.rollback()
+
+            row = (await db.execute(
+                select(IdempotencyKey)
+                .where(IdempotencyKey.workflow_id == workflow_id, IdempotencyKey.key == key)
+            )).scalars().first()
+
+        # Missing means the first call failed and released it just now; the sender should retry
+        if row is None or row.status != "done":
+            raise IdempotencyInProgress("Duplicate request is being processed")
+        return row.status_code, row.response
+
+
+idempotency_store = IdempotencyStore(
+    settings.IDEMPOTENCY_CACHE_SIZE, settings.IDEMPOTENCY_TTL, shared=settings.IDEMPOTENCY_SHARED
+)
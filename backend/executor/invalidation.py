@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from core.metrics import CACHE_EVENTS_APPLIED, DB_DURATION
+from core.security import token_cache, user_cache
+from db.database import AsyncSessionLocal, SessionLocal
+from models.cache_event import CacheEvent
+from models.workflow import Workflow
+from executor.credential_cache import credential_cache
+from executor.executor import plan_cache
+from executor.routing import route_table
+
+logger = logging.getLogger(__name__)
+
+# Ids come from a sequence but commit in any order, so a poll also re-reads
+# the last few seconds to catch an event that committed behind a newer one
+_LOOKBACK = timedelta(seconds=5)
+
+# Old events are deleted every this many polls
+_SWEEP_EVERY = 60
+
+
+class InvalidationBus:
+    """
+    Keeps the in-process caches of every API and worker process coherent.
+
+    Routers publish() a cache event in the same transaction as the change it
+    describes. Each process polls the cache_events table every
+    `poll_interval` seconds and drops what changed from its plan cache,
+    route table and credential cache; its own events were already applied
+    locally. A process that could not poll for longer than `retention` may
+    have missed deleted events, so it clears everything (auth caches
+    included) and rewarms instead. With `poll_interval` 0 (one process)
+    nothing is published, since nobody would read or sweep the events.
+    """
+
+    def __init__(self, poll_interval: float, retention: int):
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._cursor = 0
+        self._seen: Dict[int, datetime] = {}   # event ids applied within the lookback window
+        self._last_ok: Optional[float] = None
+        self._polls = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def publish(self, db: Session, kind: str, key) -> None:
+        """Record that `kind` row `key` changed; committed together with the caller's change."""
+        if not self.poll_interval:
+            return
+        db.add(CacheEvent(kind=kind, key=str(key), origin=self._origin()))
+
+    @staticmethod
+    def _origin() -> str:
+        # Not cached: a forked worker must not publish under its parent's name
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    async def start(self) -> None:
+        if not self.poll_interval:
+            return
+        async with AsyncSessionLocal() as db:
+            # Caches start empty (or are warmed right after this), so older events don't matter
+            self._cursor = (await db.execute(select(func.max(CacheEvent.id)))).scalar() or 0
+        self._last_ok = time.monotonic()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                with DB_DURATION.time(operation="cache_events_poll"):
+                    await self.poll()
+            except Exception as e:
+                logger.warning("Could not poll cache events: %s", e)
+
+    async def poll(self) -> int:
+        """Apply events published since the last poll; returns how many were applied."""
+        if self._last_ok is not None and time.monotonic() - self._last_ok > self.retention:
+            logger.warning("Cache events may have been missed, clearing all caches")
+            await self._resync()
+
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as db:
+            events = (await db.execute(
+                select(CacheEvent)
+                .where(or_(CacheEvent.id > self._cursor, CacheEvent.created_at >= now - _LOOKBACK))
+                .order_by(CacheEvent.id)
+            )).scalars().all()
+
+            self._polls += 1
+            if self._polls % _SWEEP_EVERY == 0:
+                await db.execute(delete(CacheEvent).where(CacheEvent.created_at < now - timedelta(seconds=self.retention)))
+                await db.commit()
+
+        fresh = [e for e in events if e.id not in self._seen]
+        for event in fresh:
+            self._cursor = max(self._cursor, event.id)
+            self._seen[event.id] = now
+        self._seen = {eid: at for eid, at in self._seen.items() if at >= now - 2 * _LOOKBACK}
+
+        origin = self._origin()
+        await self._apply([e for e in fresh if e.origin != origin])
+        self._last_ok = time.monotonic()
+        return len(fresh)
+
+    async def _apply(self, events: list) -> None:
+        workflow_ids = set()
+        for event in events:
+            CACHE_EVENTS_APPLIED.inc(kind=event.kind)
+            if event.kind == "workflow":
+                workflow_ids.add(int(event.key))
+            elif event.kind == "credential":
+                credential_cache.invalidate(event.key)
+            else:
+                logger.warning("Unknown cache event kind: %s", event.kind)
+
+        if not workflow_ids:
+            return
+
+        # Re-read the routes in one query; plans are recompiled lazily on the next run
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(Workflow.id, Workflow.webhook_path, Workflow.enabled, Workflow.nodes, Workflow.connections)
+                .where(Workflow.id.in_(workflow_ids))
+            )).all()
+        found = {row.id: row for row in rows}
+        for workflow_id in workflow_ids:
+            plan_cache.invalidate(workflow_id)
+            if workflow_id in found:
+                route_table.upsert(found[workflow_id])
+            else:
+                route_table.remove(workflow_id)
+
+    async def _resync(self) -> None:
+        plan_cache.clear()
+        credential_cache.clear()
+        token_cache.clear()
+        user_cache.clear()
+        await asyncio.to_thread(self._warm_routes)
+
+    @staticmethod
+    def _warm_routes() -> None:
+        db = SessionLocal()
+        try:
+            route_table.warm(db)
+        finally:
+            db.close()
+
+
+invalidation_bus = InvalidationBus(
+    poll_interval=settings.CACHE_EVENT_POLL_INTERVAL,
+    retention=settings.CACHE_EVENT_RETENTION,
+)
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import tempfile
+import threading
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from core.config import settings
+
+_UNPARSED = object()
+
+
+def _to_dict(pairs):
+    # A Python-level hook lets the GIL switch between objects; the C decoder
+    # otherwise holds it for the whole parse and stalls the event loop anyway
+    return dict(pairs)
+
+
+class PayloadTooLarge(Exception):
+    """Raised when a webhook body exceeds WEBHOOK_MAX_BODY_BYTES."""
+
+
+class LazyJSON:
+    """
+    A webhook body that is only parsed when a node first looks inside it.
+
+    Small bodies stay in memory; bodies above WEBHOOK_SPOOL_BYTES live in a
+    temporary file until the request is done, and are parsed off the event
+    loop by load(). The parsed value is cached and shared by every node of
+    the run, never copied.
+    """
+
+    def __init__(self, spool: tempfile.SpooledTemporaryFile, size: int, spooled: bool = False):
+        self._spool = spool
+        self.size = size
+        self.spooled = spooled  # rolled over to disk
+        self._value = _UNPARSED
+        self._lock = threading.Lock()
+
+    @property
+    def value(self) -> Any:
+        if self._value is _UNPARSED:
+            return self._parse()
+        return self._value
+
+    async def load(self) -> Any:
+        """Parse the body ahead of a synchronous read; spooled bodies are parsed on a worker thread."""
+        if self._value is _UNPARSED and self.spooled:
+            return await asyncio.to_thread(self._parse, object_pairs_hook=_to_dict)
+        return self.value
+
+    def _parse(self, **options) -> Any:
+        # Locked: a read racing a parse on the worker thread waits for it instead of sharing the file
+        with self._lock:
+            if self._value is _UNPARSED:
+                if self.size == 0:
+                    self._value = {}
+                else:
+                    self._spool.seek(0)
+                    try:
+                        self._value = json.load(self._spool, **options)
+                    except ValueError as e:
+                        raise ValueError(f"❌ Webhook body is not valid JSON: {e}") from None
+            return self._value
+
+    def close(self) -> None:
+        self._spool.close()
+
+
+async def read_body(request, max_bytes: int = None, spool_bytes: int = None) -> LazyJSON:
+    """
+    Stream the request body into a spooled temp file, enforcing the size limit
+    on both the declared Content-Length and the bytes actually received.
+    """
+    max_bytes = settings.WEBHOOK_MAX_BODY_BYTES if max_bytes is None else max_bytes
+    spool_bytes = settings.WEBHOOK_SPOOL_BYTES if spool_bytes is None else spool_bytes
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes:
+        raise PayloadTooLarge(f"Body of {declared} bytes exceeds the {max_bytes} byte limit")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_bytes)
+    size = 0
+    try:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > max_bytes:
+                raise PayloadTooLarge(f"Body exceeds the {max_bytes} byte limit")
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    return LazyJSON(spool, size, spooled=size > spool_bytes)
+
+
+def webhook_context(request, body: LazyJSON, test_mode: bool) -> dict:
+    """
+    Initial context of a webhook run. Headers and query params are the
+    request's own read-only mappings, and the body is passed by reference.
+    """
+    return {
+        "webhook": MappingProxyType({
+            "method": request.method,
+            "body": body,
+            "query": request.query_params,
+            "headers": request.headers,
+            "path": str(request.url.path),
+        }),
+        "test_mode": test_mode,
+    }
+
+
+async def preload(context: dict) -> None:
+    """Parse the context's webhook body, if any, before code that reads it synchronously."""
+    webhook = context.get("webhook")
+    if isinstance(webhook, Mapping) and isinstance(webhook.get("body"), LazyJSON):
+        await webhook["body"].load()
+
+
+def materialize(context: dict) -> dict:
+    """Plain, JSON-serialisable copy of a context (e.g. to store in the execution queue)."""
+    def plain(value):
+        if isinstance(value, LazyJSON):
+            return value.value
+        if isinstance(value, Mapping):
+            return {k: plain(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [plain(v) for v in value]
+        return value
+
+    return {key: plain(value) for key, value in context.items()}
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from schemas.workflow import Node, Connection
+from schemas.platform import PlatformType
+
+
+@dataclass(frozen=True)
+class NodePolicy:
+    timeout: Optional[float]        # seconds per attempt; None means NODE_TIMEOUT_SECONDS
+    retries: int = 0                # extra attempts after a transient failure
+    backoff: str = "exponential"    # or "fixed"
+    retry_delay: float = 1.0
+    retry_max_delay: float = 30.0
+
+
+@dataclass(frozen=True)
+class PlanNode:
+    id: str
+    name: str
+    platform: str
+    data: Mapping            # validated node config, credential_id merged in (read-only)
+    handler: Optional[Callable]
+    policy: NodePolicy = NodePolicy(timeout=None)
+
+
+@dataclass(frozen=True)
+class IdempotencyConfig:
+    header: Optional[str]           # request header holding the key
+    fields: Tuple[str, ...]         # or body paths whose values are hashed into it
+    ttl: Optional[int]              # seconds; None means IDEMPOTENCY_TTL
+
+
+@dataclass(frozen=True)
+class BatchConfig:
+    window_ms: Optional[int]        # None means BATCH_DEFAULT_WINDOW_MS
+    max_events: Optional[int]       # None means BATCH_DEFAULT_MAX_EVENTS
+
+
+@dataclass(frozen=True)
+class CompiledPlan:
+    """
+    Immutable, ready-to-run form of a workflow.
+
+    Built once per workflow version so webhook hits skip Pydantic validation
+    and graph construction. An execution keeps the plan object it started
+    with, so editing the workflow never changes a run that is already in flight.
+    """
+    workflow_id: int
+    version: str
+    nodes: Mapping[str, PlanNode]
+    levels: Tuple[Tuple[str, ...], ...]        # topological levels, declaration order inside each
+    edges: Mapping[str, Tuple[str, ...]]       # node id -> downstream node ids
+    parents: Mapping[str, Tuple[str, ...]]     # node id -> upstream node ids
+    response_mode: str = "on_completion"       # taken from the trigger node
+    idempotency: Optional[IdempotencyConfig] = None  # webhook dedup, from the trigger node
+    batch: Optional[BatchConfig] = None              # burst coalescing, from the trigger node
+
+
+def plan_version(nodes: Optional[list], connections: Optional[list]) -> str:
+    """Content hash of a workflow's graph, used as the plan version."""
+    raw = json.dumps({"nodes": nodes or [], "connections": connections or []}, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def compile_plan(workflow_id: int, nodes: Optional[list], connections: Optional[list],
+                 handlers: Dict[str, Callable]) -> CompiledPlan:
+    """
+    Validate a workflow's raw JSON nodes/connections and compile them into a plan.
+
+    Raises ValueError if a node fails validation, a connection points at a
+    node that does not exist, or the connections form a cycle.
+    """
+    validated = [Node(**n) if isinstance(n, dict) else n for n in (nodes or [])]
+    links = [Connection(**c) if isinstance(c, dict) else c for c in (connections or [])]
+
+    plan_nodes = {}
+    response_mode = "on_completion"
+    idempotency = None
+    batch = None
+    for node in validated:
+        data = dict(node.data) if node.data else {}
+        if node.credential_id:
+            data["credential_id"] = node.credential_id
+        if node.platform == PlatformType.TRIGGER:
+            response_mode = data.get("response_mode") or response_mode
+            if data.get("idempotency_header") or data.get("idempotency_fields"):
+                idempotency = IdempotencyConfig(
+                    header=data.get("idempotency_header"),
+                    fields=tuple(data.get("idempotency_fields") or ()),
+                    ttl=data.get("idempotency_ttl"),
+                )
+            if data.get("batch_window_ms") or data.get("batch_max_events"):
+                batch = BatchConfig(window_ms=data.get("batch_window_ms"), max_events=data.get("batch_max_events"))
+
+        plan_nodes[node.id] = PlanNode(
+            id=node.id,
+            name=node.name,
+            platform=node.platform.value,
+            data=MappingProxyType(data),
+            handler=handlers.get(node.platform.value),
+            policy=NodePolicy(
+                timeout=node.timeout_seconds,
+                retries=node.retries,
+                backoff=node.retry_backoff,
+                retry_delay=node.retry_delay_seconds,
+                retry_max_delay=node.retry_max_delay_seconds,
+            ),
+        )
+
+    edges = defaultdict(list)
+    parents = defaultdict(list)
+    in_degree = {nid: 0 for nid in plan_nodes}
+
+    for conn in links:
+        if conn.source not in plan_nodes or conn.target not in plan_nodes:
+            raise ValueError(f"❌ Connection {conn.source} -> {conn.target} references an unknown node")
+        edges[conn.source].append(conn.target)
+        parents[conn.target].append(conn.source)
+        in_degree[conn.target] += 1
+
+    # Kahn's algorithm, one level at a time
+    position = {nid: index for index, nid in enumerate(plan_nodes)}
+    levels = []
+    ready = [nid for nid, deg in in_degree.items() if deg == 0]
+    while ready:
+        levels.append(tuple(ready))
+        next_ready = []
+        for nid in ready:
+            for neighbor in edges[nid]:
+                in_degree[neighbor] -= 1
+                if in_degree[neighbor] == 0:
+                    next_ready.append(neighbor)
+        ready = sorted(next_ready, key=position.get)
+
+    # Nodes Kahn's algorithm never reached are on a cycle or downstream of one
+    stuck = [nid for nid, deg in in_degree.items() if deg > 0]
+    if stuck:
+        raise ValueError(f"❌ Connections form a cycle (nodes involved or downstream: {', '.join(stuck)})")
+
+    return CompiledPlan(
+        workflow_id=workflow_id,
+        version=plan_version(nodes, connections),
+        nodes=MappingProxyType(plan_nodes),
+        levels=tuple(levels),
+        edges=MappingProxyType({nid: tuple(edges[nid]) for nid in plan_nodes}),
+        parents=MappingProxyType({nid: tuple(parents[nid]) for nid in plan_nodes}),
+        response_mode=response_mode,
+        idempotency=idempotency,
+        batch=batch,
+    )
+
+
+class PlanCache:
+    """Thread-safe LRU of compiled plans keyed by (workflow_id, version)."""
+
+    def __init__(self, max_size: int = 512):
+        self.max_size = max_size
+        self._plans: "OrderedDict[Tuple[int, str], CompiledPlan]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, workflow_id: int, version: str) -> Optional[CompiledPlan]:
+        with self._lock:
+            plan = self._plans.get((workflow_id, version))
+            if plan is not None:
+                self._plans.move_to_end((workflow_id, version))
+            return plan
+
+    def put(self, plan: CompiledPlan) -> None:
+        with self._lock:
+            self._plans[(plan.workflow_id, plan.version)] = plan
+            self._plans.move_to_end((plan.workflow_id, plan.version))
+            while len(self._plans) > self.max_size:
+                self._plans.popitem(last=False)
+
+    def invalidate(self, workflow_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._plans if k[0] == workflow_id]:
+                del self._plans[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._plans.clear()
@@ -0,0 +1,272 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from core.log import log_context
+from core.metrics import DB_DURATION, EXECUTION_QUEUE_RUNNING
+from db.database import AsyncSessionLocal
+from models.execution import Execution
+from models.workflow import Workflow
+from executor.plan import CompiledPlan
+from executor.executor import execute_workflow, plan_cache, get_plan
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised when the execution queue cannot accept more work."""
+
+
+class ExecutionQueue:
+    """
+    Durable execution queue stored in the executions table.
+
+    Webhooks in "immediately" response mode insert a pending Execution row.
+    Workers, either inside the API process or in standalone worker processes
+    (see worker.py), claim rows by taking a lease. A running worker keeps
+    renewing its lease; if it dies, the lease expires and another worker
+    picks the job up again, until max_attempts is reached.
+
+    Claims are a conditional UPDATE, so this works the same on SQLite and
+    Postgres without row locking.
+    """
+
+    def __init__(self, concurrency: int, poll_interval: float = None, lease_seconds: int = None):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval or settings.EXECUTION_POLL_INTERVAL
+        self.lease_seconds = lease_seconds or settings.EXECUTION_LEASE_SECONDS
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+        self._tasks = []
+
+    # -------- Producer side -------- #
+
+    async def enqueue(self, plan: CompiledPlan, context: dict, test_mode: bool = False) -> int:
+        with DB_DURATION.time(operation="queue_enqueue"):
+            return await self._enqueue(plan, context, test_mode)
+
+    async def _enqueue(self, plan: CompiledPlan, context: dict, test_mode: bool) -> int:
+        async with AsyncSessionLocal() as db:
+            if await self.depth(db) >= settings.EXECUTION_QUEUE_SIZE:
+                raise QueueFull("Execution queue is full")
+
+            execution = Execution(
+                workflow_id=plan.workflow_id,
+                status="pending",
+                task_done=f"0/{len(plan.nodes)}",
+                test_mode=test_mode,
+                payload=context,
+                plan_version=plan.version,
+                max_attempts=settings.EXECUTION_MAX_ATTEMPTS,
+            )
+            db.add(execution)
+            await db.commit()
+
+        # Local workers pick it up right away; other processes on their next poll
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return execution.id
+
+    async def depth(self, db: AsyncSession) -> int:
+        result = await db.execute(select(func.count(Execution.id)).where(Execution.status == "pending"))
+        return result.scalar()
+
+    # -------- Worker side -------- #
+
+    async def start(self):
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self, grace_seconds: float = None):
+        """Stop claiming, give running jobs a grace period, then hand the rest back."""
+        self._stopping = True
+        if self._wakeup is not None:
+            self._wakeup.set()
+        if not self._tasks:
+            return
+
+        grace = settings.EXECUTION_SHUTDOWN_GRACE if grace_seconds is None else grace_seconds
+        _, pending = await asyncio.wait(self._tasks, timeout=grace)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self):
+        while not self._stopping:
+            try:
+                with DB_DURATION.time(operation="queue_claim"):
+                    job = await self._claim()
+            except Exception as e:
+                logger.error("Could not claim execution: %s", e)
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            with log_context(workflow_id=job["workflow_id"], execution_id=job["id"]), \
+                    EXECUTION_QUEUE_RUNNING.track():
+                await self._run(job)
+
+    def _claimable(self, now: datetime):
+        expired = and_(Execution.status == "running", Execution.lease_expires_at < now)
+        return and_(or_(Execution.status == "pending", expired), Execution.attempts < Execution.max_attempts)
+
+    async def _claim(self) -> Optional[dict]:
+        async with AsyncSessionLocal() as db:
+            now = datetime.utcnow()
+
+            # Jobs whose worker died on their last attempt are given up on
+            await db.execute(
+                update(Execution)
+                .where(
+                    Execution.status == "running",
+                    Execution.lease_expires_at < now,
+                    Execution.attempts >= Execution.max_attempts,
+                )
+                .values(status="failed", error="Worker lease expired", finished_at=now, lease_owner=None, payload=None)
+                .execution_options(synchronize_session=False)
+            )
+            # Pending jobs with no attempts left would never be claimed, yet count against the queue size
+            await db.execute(
+                update(Execution)
+                .where(Execution.status == "pending", Execution.attempts >= Execution.max_attempts)
+                .values(status="failed", error="No attempts left", finished_at=now, lease_owner=None, payload=None)
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+            candidates = (
+                await db.execute(
+                    select(Execution.id)
+                    .where(self._claimable(now))
+                    .order_by(Execution.id)
+                    .limit(self.concurrency)
+                )
+            ).scalars().all()
+
+            for execution_id in candidates:
+                claimed = await db.execute(
+                    update(Execution)
+                    .where(Execution.id == execution_id, self._claimable(now))
+                    .values(
+                        status="running",
+                        lease_owner=self.worker_id,
+                        lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                        attempts=Execution.attempts + 1,
+                        started_at=now,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+
+                if claimed.rowcount:
+                    row = (
+                        await db.execute(
+                            select(Execution.workflow_id, Execution.plan_version, Execution.payload)
+                            .where(Execution.id == execution_id)
+                        )
+                    ).one()
+                    return {
+                        "id": execution_id,
+                        "workflow_id": row.workflow_id,
+                        "plan_version": row.plan_version,
+                        "payload": row.payload or {},
+                    }
+            return None
+
+    async def _load_plan(self, workflow_id: int, version: str) -> CompiledPlan:
+        plan = plan_cache.get(workflow_id, version)
+        if plan is not None:
+            return plan
+
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Workflow).where(Workflow.id == workflow_id))
+            workflow = result.scalars().first()
+            if not workflow:
+                raise ValueError(f"❌ Workflow {workflow_id} no longer exists")
+            # The workflow may have been edited since the job was queued; run its current version
+            return get_plan(workflow)
+
+    async def _heartbeat(self, execution_id: int):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await db.execute(
+                        update(Execution)
+                        .where(Execution.id == execution_id, Execution.lease_owner == self.worker_id)
+                        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            except Exception as e:
+                logger.warning("Could not renew lease of execution %s: %s", execution_id, e)
+
+    async def _finish(self, execution_id: int, workflow_id: int, values: dict) -> None:
+        now = datetime.utcnow()
+        done = values["status"] != "pending"
+        values = {**values, "lease_owner": None, "lease_expires_at": None}
+        if done:
+            # The webhook body and headers (Authorization, signatures) are only needed to run the job
+            values.update(finished_at=now, payload=None)
+
+        async with AsyncSessionLocal() as db:
+            # Only the lease holder may record the outcome
+            await db.execute(
+                update(Execution)
+                .where(Execution.id == execution_id, Execution.lease_owner == self.worker_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            if done:
+                await db.execute(
+                    update(Workflow).where(Workflow.id == workflow_id).values(last_executed_at=now)
+                )
+            await db.commit()
+
+    async def _run(self, job: dict):
+        heartbeat = asyncio.create_task(self._heartbeat(job["id"]))
+        try:
+            plan = await self._load_plan(job["workflow_id"], job["plan_version"])
+            result = await execute_workflow(plan, job["payload"])
+            succeeded = sum(1 for n in result.get("executed_nodes", []) if n["status"] == "success")
+            outcome = {
+                "status": "success",
+                "result": result,
+                "task_done": f"{succeeded}/{len(plan.nodes)}",
+                "node_runs": result.get("executed_nodes"),
+            }
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so another worker retries it right away.
+            # The interrupted attempt doesn't count, or a last attempt could never be claimed again.
+            outcome = {"status": "pending", "attempts": Execution.attempts - 1}
+        except Exception as e:
+            logger.error("Execution %s failed: %s", job["id"], e)
+            outcome = {"status": "failed", "error": str(e), "node_runs": getattr(e, "executed_nodes", None)}
+        finally:
+            heartbeat.cancel()
+
+        try:
+            with DB_DURATION.time(operation="queue_finish"):
+                await asyncio.shield(self._finish(job["id"], job["workflow_id"], outcome))
+        except Exception as e:
+            logger.error("Execution %s could not be recorded: %s", job["id"], e)
+
+
+execution_queue = ExecutionQueue(settings.EXECUTION_WORKERS)
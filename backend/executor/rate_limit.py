@@ -0,0 +1,127 @@
+import asyncio
+import time
+from typing import Dict, Hashable, Optional
+
+from core.config import settings
+
+
+class TokenBucket:
+    """
+    Token bucket refilled at `rate` tokens/second, holding at most `burst`.
+
+    Waiters are served in arrival order. `pause()` blocks the bucket until a
+    deadline, e.g. when the provider answers with a retry_after hint.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return not self.waiting and self.tokens >= self.burst and now >= self.paused_until
+
+    async def acquire(self, cost: int = 1) -> None:
+        cost = min(cost, self.burst)
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    if now < self.paused_until:
+                        await asyncio.sleep(self.paused_until - now)
+                        continue
+
+                    self._refill(now)
+                    if self.tokens >= cost:
+                        self.tokens -= cost
+                        return
+                    await asyncio.sleep((cost - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+
+class RateLimiter:
+    """
+    Shared pacing for outbound sends, one token bucket per key.
+
+    Keys are chosen by the node handlers, e.g. ("telegram", credential_id)
+    for the per-bot limit and ("telegram", credential_id, chat_id) for the
+    per-chat one. Sends wait here instead of tripping provider throttles.
+    """
+
+    def __init__(self, max_buckets: int = 10000):
+        self.max_buckets = max_buckets
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+
+    def bucket(self, key: Hashable, rate: float, burst: int) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._evict_idle()
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    async def acquire(self, key: Hashable, rate: float, burst: int, cost: int = 1) -> None:
+        await self.bucket(key, rate, burst).acquire(cost)
+
+    def pause(self, key: Hashable, seconds: float) -> None:
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.pause(seconds)
+
+    def queue_depth(self, key: Optional[Hashable] = None) -> int:
+        """Sends currently waiting for a token, for one key or overall."""
+        if key is not None:
+            bucket = self._buckets.get(key)
+            return bucket.waiting if bucket else 0
+        return sum(b.waiting for b in self._buckets.values())
+
+    def queue_depths(self) -> Dict[Hashable, int]:
+        return {key: b.waiting for key, b in self._buckets.items() if b.waiting}
+
+    def _evict_idle(self) -> None:
+        for key in [k for k, b in self._buckets.items() if b.idle()]:
+            del self._buckets[key]
+
+
+rate_limiter = RateLimiter()
+
+
+# -------- Provider limits -------- #
+
+def telegram_key(credential_id) -> tuple:
+    return ("telegram", str(credential_id))
+
+
+def email_key(credential_id) -> tuple:
+    return ("email", str(credential_id))
+
+
+async def acquire_telegram(credential_id, chat_id) -> None:
+    # Per-chat first, so a slow chat doesn't sit on bot-wide tokens
+    await rate_limiter.acquire(
+        ("telegram", str(credential_id), chat_id), settings.TELEGRAM_RATE_PER_CHAT, 1
+    )
+    await rate_limiter.acquire(
+        telegram_key(credential_id), settings.TELEGRAM_RATE_PER_BOT, settings.TELEGRAM_RATE_PER_BOT
+    )
+
+
+async def acquire_email(credential_id, count: int = 1) -> None:
+    await rate_limiter.acquire(
+        email_key(credential_id), settings.EMAIL_RATE_PER_SECOND, settings.EMAIL_RATE_BURST, cost=count
+    )
@@ -0,0 +1,69 @@
+import random
+import smtplib
+import socket
+
+import httpx
+from telegram.error import NetworkError
+
+from executor.plan import NodePolicy
+
+# SMTP replies that mean "try again later" (RFC 5321 4yz codes)
+_TRANSIENT_SMTP_CODES = range(400, 500)
+
+# Raised before a request leaves (no connection, or none free in the pool);
+# python-telegram-bot keeps them as the __cause__ of its NetworkError/TimedOut
+_HTTPX_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Connecting to an SMTP server failed, so nothing was sent
+_SOCKET_NOT_SENT = (ConnectionRefusedError, socket.gaierror)
+
+
+class TransientError(Exception):
+    """
+    Raised by a node handler when its send failed for a reason worth retrying.
+
+    `result` is what the node returns if no retries are left, so a node
+    without a retry policy behaves as if it had returned it directly.
+    """
+
+    def __init__(self, message: str, result: dict):
+        super().__init__(message)
+        self.result = result
+
+
+class NodeTimeout(Exception):
+    """
+    A node attempt ran longer than its timeout and was cancelled. Never
+    retried: the send may have gone out before the cancel landed.
+    """
+
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failure is worth retrying: likely to go away on its own, and
+    known to have happened before the provider could accept the message.
+    Timeouts and dropped connections mid-send are not: the message may have
+    gone out, and a retry would send it twice.
+    """
+    if isinstance(error, TransientError):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # An explicit 4xx reply: the server refused the message for now
+        return error.smtp_code in _TRANSIENT_SMTP_CODES
+    if isinstance(error, smtplib.SMTPException):
+        # Disconnects, refused recipients... (SMTPException is an OSError)
+        return False
+    if isinstance(error, NetworkError):
+        # TimedOut and BadRequest included: only a request that never left is safe
+        return isinstance(error.__cause__, _HTTPX_NOT_SENT)
+    return isinstance(error, _SOCKET_NOT_SENT)
+
+
+def backoff_delay(policy: NodePolicy, attempt: int) -> float:
+    """Seconds to wait before retry number `attempt` (1-based), with jitter."""
+    delay = policy.retry_delay
+    if policy.backoff == "exponential":
+        delay *= 2 ** (attempt - 1)
+    delay = min(delay, policy.retry_max_delay)
+    # Keep at least half the delay; the rest spreads out retries of parallel runs
+    return delay * random.uniform(0.5, 1.0)
@@ -0,0 +1,110 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.metrics import DB_DURATION
+from db.database import AsyncSessionLocal
+from models.workflow import Workflow
+from executor.plan import CompiledPlan, plan_version
+from executor.executor import plan_cache, get_plan
+
+
+@dataclass(frozen=True)
+class WebhookRoute:
+    workflow_id: int
+    webhook_path: Optional[str]
+    enabled: bool
+    plan_version: str
+
+
+class RouteTable:
+    """
+    Resident index of webhook routes, by webhook path and by workflow id.
+
+    Lets the webhook endpoints reject unknown or disabled workflows without a
+    database round trip. Warmed at startup and kept in sync by the workflow
+    CRUD endpoints.
+    """
+
+    def __init__(self):
+        self._by_path: Dict[str, WebhookRoute] = {}
+        self._by_id: Dict[int, WebhookRoute] = {}
+        self._lock = threading.Lock()
+
+    def warm(self, db: Session) -> int:
+        rows = db.query(
+            Workflow.id, Workflow.webhook_path, Workflow.enabled, Workflow.nodes, Workflow.connections
+        ).all()
+
+        with self._lock:
+            self._by_path.clear()
+            self._by_id.clear()
+            for row in rows:
+                self._add(self._route_for(row))
+        return len(rows)
+
+    def upsert(self, workflow) -> WebhookRoute:
+        route = self._route_for(workflow)
+        with self._lock:
+            self._discard(workflow.id)
+            self._add(route)
+        return route
+
+    def remove(self, workflow_id: int) -> None:
+        with self._lock:
+            self._discard(workflow_id)
+
+    def get_by_path(self, webhook_path: str) -> Optional[WebhookRoute]:
+        return self._by_path.get(webhook_path)
+
+    def get_by_id(self, workflow_id: int) -> Optional[WebhookRoute]:
+        return self._by_id.get(workflow_id)
+
+    @staticmethod
+    def _route_for(workflow) -> WebhookRoute:
+        return WebhookRoute(
+            workflow_id=workflow.id,
+            webhook_path=workflow.webhook_path,
+            enabled=workflow.enabled is not False,
+            plan_version=plan_version(workflow.nodes, workflow.connections),
+        )
+
+    def _add(self, route: WebhookRoute) -> None:
+        self._by_id[route.workflow_id] = route
+        if route.webhook_path:
+            self._by_path[route.webhook_path] = route
+
+    def _discard(self, workflow_id: int) -> None:
+        old = self._by_id.pop(workflow_id, None)
+        if old and old.webhook_path:
+            self._by_path.pop(old.webhook_path, None)
+
+
+route_table = RouteTable()
+
+
+async def load_plan(route: WebhookRoute) -> CompiledPlan:
+    """
+    Return the plan a route points at. Only hits the database, in a
+    short-lived session, when the plan is not cached (first run after
+    startup, or evicted from the LRU).
+    """
+    plan = plan_cache.get(route.workflow_id, route.plan_version)
+    if plan is not None:
+        return plan
+
+    with DB_DURATION.time(operation="load_workflow"):
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(Workflow).where(Workflow.id == route.workflow_id))
+            workflow = result.scalars().first()
+    if not workflow:
+        route_table.remove(route.workflow_id)
+        raise ValueError(f"❌ Workflow {route.workflow_id} no longer exists")
+
+    plan = get_plan(workflow)
+    if plan.version != route.plan_version:
+        route_table.upsert(workflow)
+    return plan
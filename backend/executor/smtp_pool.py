@@ -0,0 +1,308 @@
+import asyncio
+import smtplib
+import socket
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+
+from core.config import settings
+from core.metrics import SMTP_LOGIN_DURATION
+
+PoolKey = Tuple[str, int, str]  # (host, port, from_email)
+
+
+class SendAborted(ConnectionAbortedError):
+    """The coroutine waiting on a blocking send was cancelled (node timeout)."""
+
+
+class _SendJob:
+    """
+    Links a blocking send on the SMTP thread pool to the coroutine awaiting it.
+
+    The worker thread attaches each server it talks to; when the coroutine is
+    cancelled, abort() shuts that socket down so the blocked read/write fails
+    at once instead of pinning the thread until SMTP_TIMEOUT.
+    """
+
+    def __init__(self):
+        self.aborted = False
+        self._server = None
+        self._lock = threading.Lock()
+
+    def attach(self, server: smtplib.SMTP) -> None:
+        with self._lock:
+            self._server = server
+            if self.aborted:
+                raise SendAborted("Send was cancelled")
+
+    def check(self) -> None:
+        if self.aborted:
+            raise SendAborted("Send was cancelled")
+
+    def abort(self) -> None:
+        with self._lock:
+            self.aborted = True
+            server = self._server
+        sock = getattr(server, "sock", None)
+        if sock is not None:
+            try:
+                # Not close(): the worker thread still owns the fd and closes it itself
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _SMTP(smtplib.SMTP):
+    """smtplib.SMTP that records whether the current sendmail() reached DATA."""
+
+    data_started = False
+
+    def data(self, msg):
+        # From here on the server may end up with the message even if the reply
+        # never arrives (e.g. it times out), so a resend could deliver it twice
+        self.data_started = True
+        return super().data(msg)
+
+
+class _Session:
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.last_used = time.monotonic()
+        self.last_checked = self.last_used
+
+
+class SMTPPool:
+    """
+    Pool of authenticated SMTP sessions keyed by (host, port, from_email).
+
+    Saves the TCP connect, STARTTLS and AUTH round trips on every email.
+    Idle sessions are evicted after SMTP_POOL_IDLE_TIMEOUT, sessions idle for
+    longer than SMTP_POOL_CHECK_INTERVAL are probed with NOOP before reuse,
+    and a send on a session that dropped before DATA reconnects once and
+    retries. One that dropped after DATA started is never resent.
+
+    smtplib is blocking, so sends run on a dedicated thread pool rather than
+    the default executor shared with asyncio.to_thread and Starlette.
+    """
+
+    def __init__(self, max_per_key: int, idle_timeout: float, check_interval: float, threads: int):
+        self.max_per_key = max_per_key
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+        self.threads = threads
+        self._idle: Dict[PoolKey, List[_Session]] = defaultdict(list)
+        self._slots: Dict[PoolKey, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="smtp")
+        return self._executor
+
+    def _slot(self, key: PoolKey) -> asyncio.Semaphore:
+        if key not in self._slots:
+            self._slots[key] = asyncio.Semaphore(self.max_per_key)
+        return self._slots[key]
+
+    async def _run(self, fn, *args):
+        """Run a blocking helper on the SMTP threads; cancelling the caller aborts its socket I/O."""
+        job = _SendJob()
+        future = asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, job, *args)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            job.abort()
+            raise
+
+    async def send(self, host: str, port: int, from_email: str, password: str, to_addrs, message: str) -> None:
+        """Send one message through a pooled session for this sender."""
+        key = (host, port, from_email)
+        async with self._slot(key):
+            await self._run(self._send_blocking, key, password, to_addrs, message)
+
+    async def send_many(self, host: str, port: int, from_email: str, password: str, messages: list) -> list:
+        """
+        Send a batch of (to_addrs, message) pairs back to back over one pooled
+        session. Returns one entry per message: None if sent, else the exception.
+        """
+        key = (host, port, from_email)
+        async with self._slot(key):
+            return await self._run(self._send_many_blocking, key, password, messages)
+
+    # -------- Blocking helpers (run on the SMTP thread pool) -------- #
+
+    def _connect(self, key: PoolKey, password: str, job: _SendJob) -> _Session:
+        host, port, from_email = key
+        job.check()
+        with SMTP_LOGIN_DURATION.time():
+            # Attached before connecting, so a server that never sends its banner can be aborted
+            server = _SMTP(timeout=settings.SMTP_TIMEOUT)
+            try:
+                job.attach(server)
+                code, reply = server.connect(host, port)
+                if code != 220:
+                    raise smtplib.SMTPConnectError(code, reply)
+                job.check()
+                server.starttls()
+                server.login(from_email, password)
+            except Exception:
+                self._close(server)
+                raise
+        return _Session(server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self, key: PoolKey, password: str, job: _SendJob) -> _Session:
+        while True:
+            with self._lock:
+                session = self._idle[key].pop() if self._idle[key] else None
+            if session is None:
+                return self._connect(key, password, job)
+
+            try:
+                job.attach(session.server)
+            except SendAborted:
+                self._checkin(key, session)
+                raise
+
+            idle_for = time.monotonic() - session.last_used
+            if idle_for > self.idle_timeout:
+                self._close(session.server)
+                continue
+
+            if time.monotonic() - session.last_checked > self.check_interval:
+                try:
+                    code, _ = session.server.noop()
+                    if code != 250:
+                        raise smtplib.SMTPServerDisconnected(f"NOOP returned {code}")
+                    session.last_checked = time.monotonic()
+                except (smtplib.SMTPException, OSError):
+                    self._close(session.server)
+                    continue
+
+            return session
+
+    @staticmethod
+    def _sendmail(server: _SMTP, from_email: str, to_addrs, message: str) -> None:
+        server.data_started = False
+        server.sendmail(from_email, to_addrs, message)
+
+    def _checkin(self, key: PoolKey, session: _Session) -> None:
+        now = time.monotonic()
+        session.last_used = now
+        stale = []
+        with self._lock:
+            idle = self._idle[key]
+            idle.append(session)
+            # Evict sessions that have been idle too long or exceed the pool size
+            keep = [s for s in idle if now - s.last_used <= self.idle_timeout]
+            stale = [s for s in idle if s not in keep] + keep[:-self.max_per_key]
+            self._idle[key] = keep[-self.max_per_key:]
+        for s in stale:
+            self._close(s.server)
+
+    def _send_blocking(self, job: _SendJob, key: PoolKey, password: str, to_addrs, message: str) -> None:
+        session = self._checkout(key, password, job)
+        try:
+            self._sendmail(session.server, key[2], to_addrs, message)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError):
+            # The server dropped the pooled session (or the send was aborted);
+            # reconnect once and retry, unless the message may already be there
+            self._close(session.server)
+            if session.server.data_started:
+                raise
+            session = self._connect(key, password, job)
+            try:
+                self._sendmail(session.server, key[2], to_addrs, message)
+            except Exception:
+                self._close(session.server)
+                raise
+        except smtplib.SMTPException:
+            # Message rejected (bad recipient, etc.); keep the session if it still answers
+            try:
+                session.server.rset()
+                self._checkin(key, session)
+            except (smtplib.SMTPException, OSError):
+                self._close(session.server)
+            raise
+        except Exception:
+            self._close(session.server)
+            raise
+        self._checkin(key, session)
+
+    def _send_many_blocking(self, job: _SendJob, key: PoolKey, password: str, messages: list) -> list:
+        results = []
+        session = self._checkout(key, password, job)
+        for index, (to_addrs, message) in enumerate(messages):
+            try:
+                job.check()
+                try:
+                    self._sendmail(session.server, key[2], to_addrs, message)
+                except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError) as e:
+                    # Dropped mid-batch: reconnect and carry on with the rest (unless aborted)
+                    data_started = session.server.data_started
+                    self._close(session.server)
+                    session = None
+                    session = self._connect(key, password, job)
+                    if data_started:
+                        # The server may have this one already; report it rather than send it twice
+                        results.append(e)
+                        continue
+                    self._sendmail(session.server, key[2], to_addrs, message)
+                results.append(None)
+            except smtplib.SMTPException as e:
+                # One rejected recipient doesn't fail the batch
+                results.append(e)
+                if session is not None:
+                    try:
+                        session.server.rset()
+                        continue
+                    except (smtplib.SMTPException, OSError):
+                        self._close(session.server)
+                        session = None
+                # No usable session left: report the rest as not sent
+                results.extend([e] * (len(messages) - index - 1))
+                return results
+            except OSError as e:
+                if session is not None:
+                    self._close(session.server)
+                results.extend([e] * (len(messages) - index))
+                return results
+            except BaseException:
+                # Anything else (a bad message, interpreter shutdown) must not leak the session
+                if session is not None:
+                    self._close(session.server)
+                raise
+        self._checkin(key, session)
+        return results
+
+    # -------- Shutdown -------- #
+
+    async def close(self) -> None:
+        with self._lock:
+            sessions = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+        if sessions:
+            await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), lambda: [self._close(s.server) for s in sessions]
+            )
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._slots.clear()
+
+
+smtp_pool = SMTPPool(
+    max_per_key=settings.SMTP_POOL_MAX_PER_KEY,
+    idle_timeout=settings.SMTP_POOL_IDLE_TIMEOUT,
+    check_interval=settings.SMTP_POOL_CHECK_INTERVAL,
+    threads=settings.SMTP_POOL_THREADS,
+)
@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict
+
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BotPool:
+    """
+    Process-wide registry of telegram.Bot clients keyed by access token.
+
+    Each Bot keeps its own keep-alive HTTP connection pool, so repeated sends
+    with the same token reuse TLS connections instead of opening new ones.
+    The registry is bounded; the least recently used bot is shut down once
+    nothing is sending through it anymore.
+    """
+
+    def __init__(self, max_bots: int, connections_per_bot: int):
+        self.max_bots = max_bots
+        self.connections_per_bot = connections_per_bot
+        self._bots: "OrderedDict[str, Bot]" = OrderedDict()
+        self._in_use: Dict[int, int] = {}     # id(bot) -> active senders
+        self._evicted: Dict[int, Bot] = {}    # evicted bots still in use
+        self._lock = None
+
+    async def start(self) -> None:
+        self._lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def bot(self, token: str):
+        """Borrow the shared Bot for a token: `async with bot_pool.bot(token) as bot`."""
+        bot = await self._get(token)
+        self._in_use[id(bot)] = self._in_use.get(id(bot), 0) + 1
+        try:
+            yield bot
+        finally:
+            self._in_use[id(bot)] -= 1
+            if not self._in_use[id(bot)]:
+                del self._in_use[id(bot)]
+                if self._evicted.pop(id(bot), None) is not None:
+                    await self._shutdown(bot)
+
+    async def _get(self, token: str) -> Bot:
+        bot = self._bots.get(token)
+        if bot is not None:
+            self._bots.move_to_end(token)
+            return bot
+
+        if self._lock is None:
+            await self.start()
+
+        async with self._lock:
+            bot = self._bots.get(token)
+            if bot is not None:
+                return bot
+
+            bot = Bot(
+                token=token,
+                request=HTTPXRequest(
+                    connection_pool_size=self.connections_per_bot,
+                    read_timeout=settings.TELEGRAM_TIMEOUT,
+                    write_timeout=settings.TELEGRAM_TIMEOUT,
+                    connect_timeout=settings.TELEGRAM_TIMEOUT,
+                ),
+            )
+            await bot.initialize()
+            self._bots[token] = bot
+
+            while len(self._bots) > self.max_bots:
+                _, old = self._bots.popitem(last=False)
+                if id(old) in self._in_use:
+                    self._evicted[id(old)] = old
+                else:
+                    await self._shutdown(old)
+            return bot
+
+    @staticmethod
+    async def _shutdown(bot: Bot) -> None:
+        try:
+            await bot.shutdown()
+        except Exception as e:
+            logger.warning("Error shutting down Telegram bot: %s", e)
+
+    async def close(self) -> None:
+        bots = list(self._bots.values()) + list(self._evicted.values())
+        self._bots.clear()
+        self._evicted.clear()
+        self._in_use.clear()
+        await asyncio.gather(*(self._shutdown(b) for b in bots))
+
+
+bot_pool = BotPool(
+    max_bots=settings.TELEGRAM_POOL_MAX_BOTS,
+    connections_per_bot=settings.TELEGRAM_CONNECTIONS_PER_BOT,
+)
@@ -0,0 +1,140 @@
+import asyncio
+import random
+import smtplib
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any
+
+from telegram.error import NetworkError
+
+from core.config import settings
+from executor.smtp_pool import smtp_pool
+from executor.telegram_pool import bot_pool
+
+
+@dataclass(frozen=True)
+class Transports:
+    """
+    What the node handlers send through.
+
+    `smtp` has the SMTPPool interface (send, send_many) and `telegram` the
+    BotPool one (`async with telegram.bot(token) as bot`). `paced` says
+    whether sends go through the provider rate limits; in-process fakes
+    don't need them.
+    """
+    name: str
+    smtp: Any
+    telegram: Any
+    paced: bool = True
+
+
+class FakeBehaviour:
+    """Simulated latency and failure rate shared by the fake transports."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0, seed: int = None):
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+
+    async def wait(self) -> None:
+        delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def fails(self) -> bool:
+        return self.error_rate > 0 and self._rng.random() < self.error_rate
+
+
+class FakeSMTP:
+    """In-process SMTP stand-in: records messages instead of sending them."""
+
+    def __init__(self, behaviour: FakeBehaviour, record_limit: int):
+        self.behaviour = behaviour
+        self.messages = deque(maxlen=record_limit)
+        self.sent = 0
+        self.failed = 0
+
+    def _deliver(self, from_email: str, to_addrs, message: str):
+        if self.behaviour.fails():
+            self.failed += 1
+            return smtplib.SMTPResponseException(550, "Simulated delivery failure")
+        self.sent += 1
+        self.messages.append({"from": from_email, "to": to_addrs, "message": message, "at": time.time()})
+        return None
+
+    async def send(self, host: str, port: int, from_email: str, password: str, to_addrs, message: str) -> None:
+        await self.behaviour.wait()
+        error = self._deliver(from_email, to_addrs, message)
+        if error:
+            raise error
+
+    async def send_many(self, host: str, port: int, from_email: str, password: str, messages: list) -> list:
+        # One session for the whole batch, like the real pool
+        await self.behaviour.wait()
+        return [self._deliver(from_email, to_addrs, message) for to_addrs, message in messages]
+
+    async def close(self) -> None:
+        pass
+
+
+class _FakeBot:
+    def __init__(self, owner: "FakeTelegram", token: str):
+        self._owner = owner
+        self._token = token
+
+    async def send_message(self, chat_id, text):
+        await self._owner.behaviour.wait()
+        if self._owner.behaviour.fails():
+            self._owner.failed += 1
+            raise NetworkError("Simulated Telegram failure")
+        self._owner.sent += 1
+        self._owner.messages.append({"chat_id": chat_id, "text": text, "at": time.time()})
+
+
+class FakeTelegram:
+    """In-process Telegram stand-in with the BotPool interface."""
+
+    def __init__(self, behaviour: FakeBehaviour, record_limit: int):
+        self.behaviour = behaviour
+        self.messages = deque(maxlen=record_limit)
+        self.sent = 0
+        self.failed = 0
+
+    @asynccontextmanager
+    async def bot(self, token: str):
+        yield _FakeBot(self, token)
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+def fake_transports(name: str = "fake", latency_ms: float = None, jitter_ms: float = None,
+                    error_rate: float = None, seed: int = None) -> Transports:
+    """Fake transports; unset arguments come from the FAKE_TRANSPORT_* settings."""
+    behaviour = FakeBehaviour(
+        settings.FAKE_TRANSPORT_LATENCY_MS if latency_ms is None else latency_ms,
+        settings.FAKE_TRANSPORT_JITTER_MS if jitter_ms is None else jitter_ms,
+        settings.FAKE_TRANSPORT_ERROR_RATE if error_rate is None else error_rate,
+        seed,
+    )
+    limit = settings.FAKE_TRANSPORT_RECORD_LIMIT
+    return Transports(name, FakeSMTP(behaviour, limit), FakeTelegram(behaviour, limit), paced=False)
+
+
+live = Transports("live", smtp_pool, bot_pool)
+
+# Test runs never reach real recipients, whatever TRANSPORT_MODE says
+sandbox = fake_transports("sandbox")
+
+# What normal (non-test) runs use: the pooled real clients, or fakes for load tests
+default = live if settings.TRANSPORT_MODE == "live" else fake_transports()
+
+
+def transports_for(context: dict) -> Transports:
+    return sandbox if context.get("test_mode") else default
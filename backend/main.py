@@ -1,12 +1,58 @@
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 import uvicorn
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-from db.database import create_table
+from db.database import create_table, SessionLocal, AsyncSessionLocal
 from core.config import settings
+from core import metrics
+from core.log import setup_logging
+from core.security import password_hasher
 from routers import auth, credential, webhook, workflow
+from executor.routing import route_table
+from executor.queue import execution_queue
+from executor.history import history
+from executor.batcher import event_batcher
+from executor.smtp_pool import smtp_pool
+from executor.telegram_pool import bot_pool
+from executor.rate_limit import rate_limiter
+from executor.credential_cache import credential_cache
+from executor.invalidation import invalidation_bus
 
-create_table()
+setup_logging()
+logger = logging.getLogger(__name__)
+
+if settings.DB_CREATE_TABLES:
+    create_table()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Follow cache events from the other processes, from before the warm-up on
+    await invalidation_bus.start()
+
+    # Warm the webhook routing table so webhook hits don't need the DB
+    db = SessionLocal()
+    try:
+        route_table.warm(db)
+    finally:
+        db.close()
+
+    await bot_pool.start()
+    await execution_queue.start()
+    await history.start()
+    yield
+    # Open batches become queued executions before the queue stops
+    await event_batcher.close()
+    await execution_queue.stop()
+    await history.stop()
+    await invalidation_bus.stop()
+    await smtp_pool.close()
+    await bot_pool.close()
+    password_hasher.close()
 
 
 app = FastAPI(
@@ -14,7 +60,8 @@ app = FastAPI(
     description="Implementing automations and workflows",
     version="0.1.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 
@@ -37,6 +84,28 @@ def root():
     return {"message":"Welcome to n8n Clone API"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint. Gauges backed by other components are sampled here."""
+    try:
+        async with AsyncSessionLocal() as db:
+            metrics.EXECUTION_QUEUE_PENDING.set(await execution_queue.depth(db))
+    except Exception as e:
+        logger.warning("Could not read execution queue depth: %s", e)
+
+    waiting = Counter()
+    for key, depth in rate_limiter.queue_depths().items():
+        waiting[key[0]] += depth
+    metrics.RATE_LIMIT_WAITING.replace({(platform,): depth for platform, depth in waiting.items()})
+
+    metrics.CREDENTIAL_CACHE.replace({(stat,): value for stat, value in credential_cache.stats().items()})
+    metrics.HISTORY_PENDING.set(history.depth())
+    metrics.BATCH_PENDING.set(event_batcher.depth())
+
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
+    # Development server; use serve.py to run several processes in production
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
\ No newline at end of file
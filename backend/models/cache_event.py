@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from db.database import Base
+from datetime import datetime
+
+class CacheEvent(Base):
+    """A workflow/credential/user change that every API and worker process must drop from its caches."""
+    __tablename__ = "cache_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)                    # "workflow", "credential" or "user"
+    key = Column(String, nullable=False)                     # id of the changed row
+    origin = Column(String, nullable=True)                   # process that published it (already up to date)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
@@ -1,13 +1,29 @@
-from sqlalchemy import Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, Boolean, JSON, ForeignKey, DateTime
 from sqlalchemy.orm import relationship
 from db.database import Base
+from datetime import datetime
 
 class Execution(Base):
     __tablename__ = "executions"
 
     id = Column(Integer, primary_key=True, index=True)
     workflow_id = Column(Integer, ForeignKey("workflows.id"))
-    status = Column(String, default="pending")
-    //task_done = Column(String, default="0/0")
+    status = Column(String, default="pending", index=True)  # pending -> running -> success / failed
+    task_done = Column(String, default="0/0")
+    test_mode = Column(Boolean, default=False)
+    result = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    node_runs = Column(JSON, nullable=True)         # per-node status, error, start/end times
 
-    workflow = relationship("Workflow", backref="executions")
\ No newline at end of file
+    # Durable queue bookkeeping
+    payload = Column(JSON, nullable=True)           # initial context (webhook data); cleared once finished
+    plan_version = Column(String, nullable=True)    # plan version the webhook resolved
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    lease_owner = Column(String, nullable=True)     # worker currently running the job
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+
+    workflow = relationship("Workflow", backref="executions")
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, JSON, DateTime, UniqueConstraint
+from db.database import Base
+from datetime import datetime
+
+class IdempotencyKey(Base):
+    """Shared webhook dedup record, used when IDEMPOTENCY_SHARED is on (several API processes)."""
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (UniqueConstraint("workflow_id", "key", name="uq_idempotency_workflow_key"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    workflow_id = Column(Integer, nullable=False)
+    key = Column(String(64), nullable=False)                 # sha256 hex of the header value / body fields
+    status = Column(String, default="running")               # running -> done (failed runs are deleted)
+    status_code = Column(Integer, nullable=True)
+    response = Column(JSON, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, JSON, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, JSON, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from db.database import Base
 from datetime import datetime
@@ -6,6 +6,10 @@ import uuid
 
 class Workflow(Base):
    __tablename__ = "workflows"
+   __table_args__ = (
+       # Per-user listing, newest first, with keyset pagination on id
+       Index("ix_workflows_user_id_id", "user_id", "id"),
+   )
 
    id = Column(Integer, primary_key=True, index=True)
    title = Column(String, nullable=False)
@@ -1,52 +1,56 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from db.database import get_db
+from fastapi import APIRouter, HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from db.database import AsyncSessionLocal
 from models.user import User
 from schemas.user import UserCreate, UserLogin, UserResponse
-from datetime import datetime, timedelta
-from jose import jwt, JWTError
-from passlib.context import CryptContext
 
-from fastapi.security import OAuth2PasswordBearer
+from core.security import create_access_token, password_hasher, HasherBusy
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="signin")
-
-# JWT settings
-SECRET_KEY = "b8f7d1a6e4c9f7b2a1d3e5f8b0c2a7d9e6f1b3c4d5a6e7f8b9c0d1e2f3a4b5c6"  # replace with env var in production
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 router = APIRouter(tags=["Auth"])
 
-# Helper functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# Helper functions (bcrypt runs on the dedicated hashing pool, not Starlette's)
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many sign-in attempts in progress, retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except HasherBusy:
+        raise _busy()
 
-def create_access_token(data: dict, expires_delta: timedelta = None):
-    to_encode = data.copy()
-    expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+async def verify_password(plain_password, hashed_password):
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherBusy:
+        raise _busy()
 
 
+# Sessions are short and never held across the hashing pool's queue, so a
+# login storm cannot tie up the connections webhooks and executions need.
+
 # Signup
 @router.post("/signup", response_model=UserResponse)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
-
-    print("i was here")
-    existing = db.query(User).filter(User.email == user.email).first()
+async def signup(user: UserCreate):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User.id).where(User.email == user.email))
+        existing = result.first()
     if existing:
         raise HTTPException(status_code=400, detail="Email already exists")
 
-    hashed_pwd = hash_password(user.password)
+    hashed_pwd = await hash_password(user.password)
     new_user = User(email=user.email, password=hashed_pwd, name=user.name)
-    db.add(new_user)    
-    db.commit()
-    db.refresh(new_user)
+    async with AsyncSessionLocal() as db:
+        db.add(new_user)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Same email signed up while we were hashing
+            raise HTTPException(status_code=400, detail="Email already exists")
 
     return {
         "user": {
@@ -58,10 +62,12 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
 
 # Signin
 @router.post("/signin")
-def signin(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def signin(user: UserLogin):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(User).where(User.email == user.email))
+        db_user = result.scalars().first()
     
-    if not db_user or not verify_password(user.password, db_user.password):
+    if not db_user or not await verify_password(user.password, db_user.password):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token(data={"sub": str(db_user.id)})
@@ -3,27 +3,14 @@ from sqlalchemy.orm import Session
 from db.database import get_db
 from models.credentials import Credentials
 from schemas.credentials import CredentialCreate, CredentialResponse
+from executor.credential_cache import credential_cache
+from executor.invalidation import invalidation_bus
 
-from routers.auth import SECRET_KEY, ALGORITHM
-from jose import jwt, JWTError
-from fastapi.security import OAuth2PasswordBearer
+from core.security import get_current_user
 
 router = APIRouter(tags=["Credential"])
 
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="signin")
-
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        return user_id
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-
 @router.get("/credential", response_model=list[CredentialResponse])
 def get_all_credentials(
     db: Session = Depends(get_db),
@@ -48,8 +35,12 @@ def create_credential(
 ):
     new_cred = Credentials(**cred.dict(), user_id=user_id)
     db.add(new_cred)
+    db.flush()
+    invalidation_bus.publish(db, "credential", new_cred.id)
     db.commit()
     db.refresh(new_cred)
+    # SQLite may hand out the id of a deleted credential again
+    credential_cache.invalidate(new_cred.id)
     return new_cred
 
 
@@ -57,5 +48,7 @@ def create_credential(
 def delete_credential(cred_id: int, db: Session = Depends(get_db)):
     cred = db.query(Credentials).filter(Credentials.id == cred_id).first()
     db.delete(cred)
+    invalidation_bus.publish(db, "credential", cred_id)
     db.commit()
+    credential_cache.invalidate(cred_id)
     return{"message": "Credentials Deleted"}
\ No newline at end of file
@@ -1,136 +1,274 @@
-from fastapi import HTTPException, Depends, APIRouter, Request
+from fastapi import HTTPException, Depends, APIRouter, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from db.database import get_db
 from models.workflow import Workflow
-from schemas.workflow import WorkflowResponse
+from models.execution import Execution
+from schemas.execution import ExecutionRead
 from executor.executor import execute_workflow
+from executor.routing import WebhookRoute, route_table, load_plan
+from executor.queue import execution_queue, QueueFull
+from executor.history import history
+from executor.payload import PayloadTooLarge, read_body, webhook_context, materialize, preload
+from executor.idempotency import IdempotencyInProgress, idempotency_key, idempotency_store
+from executor.batcher import BatchFull, batch_context, event_batcher
+from core.security import check_execution_token, execution_token
 from datetime import datetime
 from typing import Optional
+import asyncio
+import logging
 
 router = APIRouter(tags=["Webhook"])
+logger = logging.getLogger(__name__)
 
 
 @router.api_route("/webhook/{webhook_path}", methods=["GET", "POST"])
 async def webhook_handler_by_path(
     webhook_path: str,
-    request: Request,
-    db: Session = Depends(get_db)
+    request: Request
 ):
     """
     n8n-style webhook handler that triggers workflows by their unique webhook path.
     Accepts both GET and POST requests, passing request data to the workflow.
     """
-    # Find workflow by webhook path
-    workflow_data = db.query(Workflow).filter(Workflow.webhook_path == webhook_path).first()
-    if not workflow_data:
+    # Find workflow by webhook path (in-memory, no DB round trip)
+    route = route_table.get_by_path(webhook_path)
+    if not route:
         raise HTTPException(status_code=404, detail="Webhook not found")
     
-    if not workflow_data.enabled:
+    if not route.enabled:
         raise HTTPException(status_code=400, detail="Workflow is disabled")
     
-    return await _execute_webhook(workflow_data, request, db)
+    return await _execute_webhook(route, request)
 
 
 @router.api_route("/webhook/handler/{workflow_id}", methods=["GET", "POST"])
 async def webhook_handler_by_id(
     workflow_id: int,
-    request: Request,
-    db: Session = Depends(get_db)
+    request: Request
 ):
     """
     Legacy webhook handler that triggers workflows by their ID.
     Kept for backwards compatibility.
     """
-    workflow_data = db.query(Workflow).filter(Workflow.id == workflow_id).first()
-    if not workflow_data:
+    route = route_table.get_by_id(workflow_id)
+    if not route:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    return await _execute_webhook(workflow_data, request, db)
+    return await _execute_webhook(route, request)
 
 
 @router.post("/webhook/test/{workflow_id}")
 async def test_webhook(
     workflow_id: int,
-    request: Request,
-    db: Session = Depends(get_db)
+    request: Request
 ):
     """
     Test mode for workflow execution - used by frontend to test workflows
     without needing the actual webhook URL.
     """
-    workflow_data = db.query(Workflow).filter(Workflow.id == workflow_id).first()
-    if not workflow_data:
+    route = route_table.get_by_id(workflow_id)
+    if not route:
         raise HTTPException(status_code=404, detail="Workflow not found")
     
-    return await _execute_webhook(workflow_data, request, db, test_mode=True)
+    return await _execute_webhook(route, request, test_mode=True)
+
+
+@router.get("/execution/{execution_id}", response_model=ExecutionRead)
+def get_execution(
+    execution_id: int,
+    token: Optional[str] = Query(None, description="from the status_url the webhook returned"),
+    db: Session = Depends(get_db)
+):
+    """
+    Status of an execution queued by a webhook in "immediately" response mode.
+    Ids are sequential, so the status_url carries a token only the server can mint.
+    """
+    # A wrong token looks exactly like a missing execution
+    if not check_execution_token(execution_id, token):
+        raise HTTPException(status_code=404, detail="Execution not found")
+    execution = db.query(Execution).filter(Execution.id == execution_id).first()
+    if not execution:
+        raise HTTPException(status_code=404, detail="Execution not found")
+    return execution
+
+
+def _record_execution(route: WebhookRoute, test_mode: bool, started_at: datetime, finished_at: datetime,
+                      result: dict = None, error: Exception = None):
+    """Hand an inline execution to the write-behind history buffer (no DB write here)."""
+    node_runs = result.get("executed_nodes") if result else getattr(error, "executed_nodes", None)
+    succeeded = sum(1 for n in node_runs or [] if n.get("status") == "success")
+    history.record({
+        "workflow_id": route.workflow_id,
+        "status": "failed" if error else "success",
+        "task_done": f"{succeeded}/{len(node_runs or [])}",
+        "test_mode": test_mode,
+        "result": result,
+        "error": str(error) if error else None,
+        "created_at": started_at,
+        "started_at": started_at,
+        "finished_at": finished_at,
+        "node_runs": node_runs,
+    })
 
 
 async def _execute_webhook(
-    workflow_data: Workflow,
+    route: WebhookRoute,
     request: Request,
-    db: Session,
     test_mode: bool = False
 ):
     """
     Internal function to execute a workflow via webhook.
     Passes request body and query params to the workflow context.
     """
-    # Parse incoming data
-    body = {}
-    query_params = dict(request.query_params)
-    
-    if request.method == "POST":
-        try:
-            body = await request.json()
-        except:
-            body = {}
-    
-    # Build initial context with webhook data (n8n-style)
-    initial_context = {
-        "webhook": {
-            "method": request.method,
-            "body": body,
-            "query": query_params,
-            "headers": dict(request.headers),
-            "path": str(request.url.path),
-        },
-        "test_mode": test_mode,
-    }
-    
-    workflow_schema = WorkflowResponse.from_orm(workflow_data)
-    
+    # Stream the body (size-bounded, spooled to disk when large); parsed only if a node reads it
+    try:
+        body = await read_body(request)
+    except PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    try:
+        initial_context = webhook_context(request, body, test_mode)
+        return await _run_webhook(route, request, initial_context, test_mode)
+    finally:
+        body.close()
+
+
+async def _remember_response(route: WebhookRoute, plan, key: str, status_code: int, content: dict):
+    """Store a successful response under its idempotency key; never fails the request."""
+    try:
+        await idempotency_store.complete(
+            route.workflow_id, key, status_code, jsonable_encoder(content), plan.idempotency.ttl
+        )
+    except Exception as e:
+        logger.warning("Could not record idempotency key for workflow %s: %s", route.workflow_id, e)
+
+
+async def _run_webhook(route: WebhookRoute, request: Request, initial_context: dict, test_mode: bool):
     execution_start = datetime.utcnow()
+    dedup_key = None  # set while this call holds an idempotency key
     
     try:
-        result = await execute_workflow(workflow_schema, db, initial_context)
-        
-        # Update last executed timestamp
-        workflow_data.last_executed_at = datetime.utcnow()
-        db.commit()
+        # Compiled once per workflow version, reused across webhook hits
+        plan = await load_plan(route)
+
+        # A retried webhook gets the first call's response instead of running the workflow again
+        if plan.idempotency and not test_mode:
+            try:
+                if plan.idempotency.fields:
+                    await preload(initial_context)
+                key = idempotency_key(plan.idempotency, request.headers, initial_context)
+            except ValueError as e:
+                # idempotency_fields parse the body, which may not be valid JSON
+                raise HTTPException(status_code=400, detail=str(e))
+            if key:
+                try:
+                    stored = await idempotency_store.claim(route.workflow_id, key, plan.idempotency.ttl)
+                except IdempotencyInProgress as e:
+                    raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+                if stored:
+                    status_code, content = stored
+                    return JSONResponse(status_code=status_code, content=content, headers={"Idempotent-Replayed": "true"})
+                dedup_key = key
+
+        if plan.batch:
+            try:
+                await preload(initial_context)
+                event = materialize(initial_context)["webhook"]
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+
+            if test_mode:
+                # Test runs execute inline, as a batch of one, so they see the same shape
+                initial_context = batch_context([event], test_mode=True)
+            else:
+                # Buffered; the batch runs as one queued execution when its window closes
+                try:
+                    batch_size = await event_batcher.add(route.webhook_path, plan, event)
+                except BatchFull as e:
+                    raise HTTPException(status_code=503, detail=str(e))
+
+                content = {
+                    "workflow_id": route.workflow_id,
+                    "webhook_path": route.webhook_path,
+                    "status": "batched",
+                    "batch_size": batch_size,
+                }
+                if dedup_key:
+                    await _remember_response(route, plan, dedup_key, 202, content)
+                    dedup_key = None
+                return JSONResponse(status_code=202, content=content)
+
+        # Respond right away and let the execution queue run the workflow
+        if plan.response_mode == "immediately" and not test_mode:
+            # The queued job outlives this request, so it gets a plain copy of the payload
+            try:
+                await preload(initial_context)
+                payload = materialize(initial_context)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            try:
+                execution_id = await execution_queue.enqueue(plan, payload)
+            except QueueFull as e:
+                raise HTTPException(status_code=503, detail=str(e))
+
+            content = {
+                "workflow_id": route.workflow_id,
+                "webhook_path": route.webhook_path,
+                "status": "queued",
+                "execution_id": execution_id,
+                "status_url": str(
+                    request.url_for("get_execution", execution_id=execution_id)
+                    .include_query_params(token=execution_token(execution_id))
+                ),
+            }
+            if dedup_key:
+                await _remember_response(route, plan, dedup_key, 202, content)
+                dedup_key = None
+            return JSONResponse(status_code=202, content=content)
+
+        result = await execute_workflow(plan, initial_context)
         
         execution_end = datetime.utcnow()
+        # Execution row and last_executed_at are written in bulk by the history buffer
+        _record_execution(route, test_mode, execution_start, execution_end, result=result)
         execution_time_ms = (execution_end - execution_start).total_seconds() * 1000
         
-        return {
-            "workflow_id": workflow_data.id,
-            "webhook_path": workflow_data.webhook_path,
+        response = {
+            "workflow_id": route.workflow_id,
+            "webhook_path": route.webhook_path,
             "status": "success",
             "test_mode": test_mode,
             "execution_time_ms": round(execution_time_ms, 2),
             "result": result
         }
+        if dedup_key:
+            await _remember_response(route, plan, dedup_key, 200, response)
+            dedup_key = None
+        return response
+
+    except HTTPException:
+        raise
         
     except Exception as e:
         execution_end = datetime.utcnow()
+        _record_execution(route, test_mode, execution_start, execution_end, error=e)
         execution_time_ms = (execution_end - execution_start).total_seconds() * 1000
         
         raise HTTPException(
             status_code=500,
             detail={
-                "workflow_id": workflow_data.id,
+                "workflow_id": route.workflow_id,
                 "status": "failed",
                 "test_mode": test_mode,
                 "execution_time_ms": round(execution_time_ms, 2),
                 "error": str(e)
             }
-        )
\ No newline at end of file
+        )
+
+    finally:
+        # Still held means the call did not succeed (error, or cancelled by a client
+        # disconnect or shutdown): forget the key so the sender's retry runs again
+        if dedup_key:
+            await asyncio.shield(idempotency_store.release(route.workflow_id, dedup_key))
\ No newline at end of file
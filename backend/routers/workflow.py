@@ -1,37 +1,20 @@
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import JSON, case, cast, func, literal
 from sqlalchemy.orm import Session
 from db.database import get_db
 from models.workflow import Workflow
-from models.user import User
-from schemas.workflow import WorkflowCreate, WorkflowResponse, WorkflowUpdate
+from schemas.workflow import WorkflowCreate, WorkflowResponse, WorkflowUpdate, WorkflowPage
+from executor.executor import plan_cache, refresh_plan
+from executor.routing import route_table
+from executor.invalidation import invalidation_bus
 
-from jose import jwt, JWTError
-from routers.auth import SECRET_KEY, ALGORITHM
-from fastapi.security import OAuth2PasswordBearer
+from core.security import get_current_user, user_cache
 
 
 router = APIRouter(tags=["Workflow"])
 
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="signin")
-
-# Add authentication dependency
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    try:
-        print(f"[DEBUG] Token received: {token[:50]}..." if len(token) > 50 else f"[DEBUG] Token: {token}")
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        print(f"[DEBUG] Payload decoded: {payload}")
-        user_id_str = payload.get("sub")
-        if user_id_str is None:
-            print("[DEBUG] user_id is None!")
-            raise HTTPException(status_code=401, detail="Invalid token")
-        user_id = int(user_id_str)  # Convert string back to int
-        print(f"[DEBUG] User ID extracted: {user_id}")
-        return user_id
-    except JWTError as e:
-        print(f"[DEBUG] JWTError: {e}")
-        raise HTTPException(status_code=401, detail="Invalid token")
-
 # Create workflow
 @router.post("/workflow", response_model=WorkflowResponse)
 def create_workflow(
@@ -40,16 +23,21 @@ def create_workflow(
     user_id: int = Depends(get_current_user)
 ):
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    # Cached: repeated creates by the same user skip the lookup
+    if not user_cache.exists(db, user_id):
         raise HTTPException(status_code=404, detail="User not found")
 
     new_workflow = Workflow(**workflow.dict(), user_id=user_id)
     # Generate unique webhook path
     new_workflow.webhook_path = new_workflow.generate_webhook_path()
     db.add(new_workflow)
+    db.flush()
+    # Other processes learn the new route on their next poll
+    invalidation_bus.publish(db, "workflow", new_workflow.id)
     db.commit()
     db.refresh(new_workflow)
+    refresh_plan(new_workflow)
+    route_table.upsert(new_workflow)
     return new_workflow
 
 
@@ -62,6 +50,47 @@ def get_all_workflows(
     return db.query(Workflow).filter(Workflow.user_id == user_id).all()
 
 
+def _node_count(db: Session):
+    """Length of the nodes JSON array, computed in the database."""
+    if db.bind.dialect.name == "postgresql":
+        # Postgres rejects json_array_length on a JSON null
+        nodes = case((func.json_typeof(Workflow.nodes) == "array", Workflow.nodes), else_=cast(literal("[]"), JSON))
+        return func.json_array_length(nodes)
+    return func.coalesce(func.json_array_length(Workflow.nodes), 0)
+
+
+# List workflow summaries (paginated, no nodes/connections payload)
+@router.get("/workflow/summary", response_model=WorkflowPage)
+def list_workflow_summaries(
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user)
+):
+    # Only scalar columns are selected; the JSON columns are never loaded.
+    # Keyset on id (newest first) uses ix_workflows_user_id_id and stays fast on deep pages.
+    query = db.query(
+        Workflow.id,
+        Workflow.title,
+        Workflow.enabled,
+        Workflow.webhook_path,
+        _node_count(db).label("node_count"),
+        Workflow.created_at,
+        Workflow.updated_at,
+        Workflow.last_executed_at,
+    ).filter(Workflow.user_id == user_id)
+    if cursor is not None:
+        query = query.filter(Workflow.id < cursor)
+
+    rows = query.order_by(Workflow.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": [row._asdict() for row in rows],
+        "next_cursor": rows[-1].id if has_more else None,
+    }
+
+
 # Get workflow by ID
 @router.get("/workflow/{workflow_id}", response_model=WorkflowResponse)
 def get_workflow(workflow_id: int, db: Session = Depends(get_db)):
@@ -85,8 +114,11 @@ def update_workflow(
     for key, value in workflow.dict(exclude_unset=True).items():
         setattr(db_wf, key, value)
 
+    invalidation_bus.publish(db, "workflow", workflow_id)
     db.commit()
     db.refresh(db_wf)
+    refresh_plan(db_wf)
+    route_table.upsert(db_wf)
     return db_wf
 
 
@@ -98,5 +130,8 @@ def delete_workflow(workflow_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Workflow not found")
     
     db.delete(wf)
+    invalidation_bus.publish(db, "workflow", workflow_id)
     db.commit()
+    plan_cache.invalidate(workflow_id)
+    route_table.remove(workflow_id)
     return {"message": "Workflow deleted successfully"}
\ No newline at end of file
@@ -5,4 +5,6 @@ from typing import Optional
 class EmailCredential(BaseModel):
     from_email: EmailStr
     app_password: str
+    smtp_host: str = "smtp.gmail.com"
+    smtp_port: int = 587
     
\ No newline at end of file
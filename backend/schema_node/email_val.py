@@ -1,10 +1,25 @@
-from typing import Optional
-from pydantic import BaseModel, EmailStr
+from typing import Optional, List, Union
+from pydantic import BaseModel, ConfigDict, EmailStr, model_validator
+
+class Recipient(BaseModel):
+    # Other fields (name, plan...) are kept and fill {{ field }} placeholders
+    model_config = ConfigDict(extra="allow")
+
+    email: EmailStr
 
 class EmailData(BaseModel):
-    to_email: EmailStr
+    to_email: Optional[EmailStr] = None
     subject: Optional[str]
     body: str
 
+    # Batch mode: send to many recipients over one SMTP session.
+    # Subject/body may use {{ field }} placeholders filled per recipient.
+    # Entries are plain addresses or objects with an "email" field, like the list at recipients_path.
+    recipients: Optional[List[Union[EmailStr, Recipient]]] = None
+    recipients_path: Optional[str] = None  # dotted path into the context, e.g. "webhook.body.subscribers"
 
-
+    @model_validator(mode="after")
+    def check_recipients(self):
+        if not (self.to_email or self.recipients or self.recipients_path):
+            raise ValueError("to_email, recipients or recipients_path is required")
+        return self
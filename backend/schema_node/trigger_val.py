@@ -1,4 +1,21 @@
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 
 class TriggerData(BaseModel):
-    condition: str
\ No newline at end of file
+    condition: str
+    # "on_completion": webhook waits for the workflow and returns its result
+    # "immediately": webhook queues the execution and returns 202 with its id
+    response_mode: Literal["on_completion", "immediately"] = "on_completion"
+
+    # Deduplicate retried webhooks: a repeat of the same key within the TTL
+    # gets the first call's response instead of running the workflow again.
+    # The key is the header's value, or a hash of the listed body fields.
+    idempotency_header: Optional[str] = None               # e.g. "Idempotency-Key"
+    idempotency_fields: Optional[List[str]] = None         # dotted body paths, e.g. ["event.id"]
+    idempotency_ttl: Optional[int] = Field(None, gt=0)     # seconds; defaults to IDEMPOTENCY_TTL
+
+    # Coalesce bursts: buffer events and run the workflow once per batch with
+    # all of them (webhook.events / webhook.body as lists). Setting either
+    # field turns batching on; the webhook then always answers 202.
+    batch_window_ms: Optional[int] = Field(None, gt=0)     # flush this long after a batch's first event
+    batch_max_events: Optional[int] = Field(None, gt=0)    # or as soon as this many have arrived
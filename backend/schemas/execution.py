@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Any, Dict, List
+from datetime import datetime
 
 class ExecutionBase(BaseModel):
     workflow_id: int
@@ -18,6 +19,14 @@ class ExecutionUpdate(ExecutionBase):
 
 class ExecutionRead(ExecutionBase):
     id: int
+    workflow_id: Optional[int] = None
+    test_mode: Optional[bool] = False
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    node_runs: Optional[List[Dict[str, Any]]] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        from_attributes = True
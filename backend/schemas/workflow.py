@@ -1,5 +1,5 @@
-from typing import Optional, List, Dict, Any
-from pydantic import BaseModel, validator
+from typing import Optional, List, Dict, Any, Literal
+from pydantic import BaseModel, Field, validator
 from datetime import datetime
 from schemas.platform import PlatformType
 from schema_node.email_val import EmailData
@@ -13,6 +13,16 @@ class Node(BaseModel):
     data: Dict = {}
     credential_id: Optional[str] = None
 
+    # Execution policy: each attempt is cancelled after timeout_seconds (not
+    # retried; time waiting on rate limits doesn't count, so in batch mode it
+    # bounds each chunk), and sends that failed transiently before anything
+    # went out (could not connect, SMTP 4xx reply) are retried
+    timeout_seconds: Optional[float] = Field(None, gt=0)     # defaults to NODE_TIMEOUT_SECONDS
+    retries: int = Field(0, ge=0, le=10)                     # extra attempts after a transient failure
+    retry_backoff: Literal["fixed", "exponential"] = "exponential"
+    retry_delay_seconds: float = Field(1.0, ge=0)            # wait before the first retry
+    retry_max_delay_seconds: float = Field(30.0, ge=0)       # cap for exponential backoff
+
     @validator("data")
     def validate_data(cls, v, values):
         platform = values.get("platform")
@@ -51,6 +61,24 @@ class WorkflowUpdate(BaseModel):
     nodes: Optional[List[Node]] = None
     connections: Optional[List[Connection]] = None
 
+class WorkflowSummary(BaseModel):
+    """Dashboard listing row: no nodes/connections JSON, just its size."""
+    id: int
+    title: str
+    enabled: Optional[bool] = True
+    webhook_path: Optional[str] = None
+    node_count: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    last_executed_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class WorkflowPage(BaseModel):
+    items: List[WorkflowSummary]
+    next_cursor: Optional[int] = None  # pass back as ?cursor= for the next page; None on the last page
+
 class WorkflowResponse(WorkflowBase):
     id: int
     user_id: int
@@ -0,0 +1,61 @@
+"""
+Production entry point: several API processes sharing one port.
+
+Creates missing tables once, then lets uvicorn spawn and supervise the
+worker processes (restarting any that die). Each process keeps its own
+caches; they stay coherent through the cache_events table (see
+executor/invalidation.py), so no broker is needed.
+
+    python serve.py --workers 4 --port 8001
+
+For development, `python main.py` still runs a single auto-reloading process.
+"""
+import argparse
+import logging
+import os
+
+import uvicorn
+
+from db.database import create_table
+import models.user  # registers every table before create_table
+import models.workflow
+import models.credentials
+import models.execution
+import models.idempotency
+import models.cache_event
+from core.config import settings
+from core.log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="API processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    setup_logging()
+    create_table()
+    # Workers re-read the settings from the environment; concurrent CREATE TABLEs can clash on Postgres
+    os.environ["DB_CREATE_TABLES"] = "false"
+
+    if args.workers > 1 and not settings.CACHE_EVENT_POLL_INTERVAL:
+        logger.warning("CACHE_EVENT_POLL_INTERVAL is 0: workers will serve stale workflows and credentials")
+    if args.workers > 1 and not settings.IDEMPOTENCY_SHARED:
+        logger.warning("IDEMPOTENCY_SHARED is off: duplicate webhooks are only caught within one worker")
+
+    logger.info("Starting %d API workers on %s:%d", args.workers, args.host, args.port)
+    uvicorn.run(
+        "main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_config=None,  # main.py sets up logging in each worker
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Standalone execution worker.
+
+Runs workflows queued by webhooks in "immediately" response mode, separately
+from the API process. Start as many as needed; they coordinate through
+leases on the executions table.
+
+    python worker.py --processes 4 --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import signal
+
+from db.database import create_table
+import models.user  # registers the User mapper referenced by Workflow.user
+from executor.queue import ExecutionQueue
+from executor.invalidation import invalidation_bus
+from executor.smtp_pool import smtp_pool
+from executor.telegram_pool import bot_pool
+from core.config import settings
+from core.log import setup_logging
+
+logger = logging.getLogger(__name__)
+
+
+async def _serve(concurrency: int):
+    await bot_pool.start()
+    # Edited workflows and credentials reach the caches of this process too
+    await invalidation_bus.start()
+    queue = ExecutionQueue(concurrency)
+    await queue.start()
+    logger.info("Worker %s running %d concurrent executions", queue.worker_id, concurrency)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    await stop.wait()
+    logger.info("Worker %s shutting down", queue.worker_id)
+    await queue.stop()
+    await invalidation_bus.stop()
+    await smtp_pool.close()
+    await bot_pool.close()
+
+
+def run_worker(concurrency: int):
+    # Per process: the log writer thread does not survive fork
+    setup_logging()
+    asyncio.run(_serve(concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run workflow execution workers")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--concurrency", type=int, default=settings.EXECUTION_WORKERS or 4,
+                        help="executions each process runs at once")
+    args = parser.parse_args()
+
+    create_table()
+
+    if args.processes <= 1:
+        run_worker(args.concurrency)
+        return
+
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(args.concurrency,), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for p in processes:
+        p.start()
+
+    # Children get SIGINT from the terminal themselves; forward SIGTERM
+    def _terminate(signum, frame):
+        for p in processes:
+            p.terminate()
+
+    signal.signal(signal.SIGTERM, _terminate)
+    for p in processes:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()